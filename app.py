@@ -1,13 +1,46 @@
 from flask import Flask
 
-app = Flask(__name__)
 
-from config import *
+def create_app(config=None):
+    """
+    Builds the app from config.Config, with `config` (a dict, or an object
+    or class with upper-case attributes) layered on top. Creating the app
+    never touches the database; run `flask init-db` once to create the
+    schema and the admin account.
+    """
+    app = Flask(__name__)
 
-from models import *
+    from config import Config
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    from models import db
+    from services import configure_engine_options, configure_read_replica, configure_shards, init_sqlite, init_read_routing, init_sharding
+    configure_engine_options(app)
+    configure_read_replica(app)
+    configure_shards(app)
+    db.init_app(app)
+    init_sqlite(app)
+    init_sharding(app)
+    init_read_routing(app)
+
+    from routes import register_blueprints
+    register_blueprints(app)
+
+    from commands import register_commands
+    register_commands(app)
+
+    from services import init_fragment_cache, init_metrics, init_profiling, init_compression
+    init_fragment_cache(app)
+    init_metrics(app)
+    init_profiling(app)
+    init_compression(app)
+
+    return app
 
-from routes import register_blueprints
-register_blueprints(app)
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
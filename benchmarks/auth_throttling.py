@@ -0,0 +1,196 @@
+"""
+Auth throttling and password hashing benchmark.
+
+Checks that an IP past AUTH_IP_LIMIT gets 429 with Retry-After while other
+IPs carry on, that an email past AUTH_EMAIL_LIMIT failed logins is refused
+from any IP, that a full hashing queue answers 503 straight away, and that
+a login with a hash of another method or cost stores a fresh one. Then
+runs booking threads on their own and next to a login storm from many
+IPs: with hashing as good as inline (an executor as wide as the storm,
+not reniced), with the configured executor, and with throttling on too.
+Reports booking throughput and p95 in each phase.
+
+    python benchmarks/auth_throttling.py --bookers 2 --storm 16 --seconds 4
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from harness import bootstrap, seed, login, FIRST_USER_ID
+
+PASSWORD = 'password'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bookers', type=int, default=2, help='threads booking and releasing spots')
+    parser.add_argument('--storm', type=int, default=16, help='threads logging in, each from its own IP')
+    parser.add_argument('--seconds', type=float, default=4, help='length of each phase')
+    return parser.parse_args()
+
+
+def client_from(app, address):
+    client = app.test_client()
+    client.environ_base['REMOTE_ADDR'] = address
+    return client
+
+
+def log_in(client, email, password=PASSWORD):
+    return client.post('/auth/login', data={'email': email, 'password': password})
+
+
+def check(app, errors):
+    from werkzeug.security import generate_password_hash
+    from models import db, User
+    from services import PasswordHasher
+
+    app.config.update(AUTH_IP_LIMIT='5/60', AUTH_EMAIL_LIMIT='3/60')
+    app.extensions.pop('auth_limits', None)
+
+    client = client_from(app, '10.1.0.1')
+    statuses = [log_in(client, 'user1@example.com').status_code for _ in range(6)]
+    if statuses[:5] != [302] * 5 or statuses[5] != 429:
+        errors.append(f'six logins from one IP answered {statuses}, expected five 302 then 429')
+    elif not client.post('/auth/login', data={'email': 'user1@example.com', 'password': PASSWORD}).headers.get('Retry-After'):
+        errors.append('a throttled login has no Retry-After')
+    if log_in(client_from(app, '10.1.0.2'), 'user1@example.com').status_code != 302:
+        errors.append('another IP was throttled too')
+
+    for n in range(3):
+        log_in(client_from(app, f'10.2.0.{n}'), 'user2@example.com', 'wrong')
+    client = client_from(app, '10.2.1.1')
+    log_in(client, 'user2@example.com')
+    with client.session_transaction() as sess:
+        if 'user_id' in sess:
+            errors.append('an email past AUTH_EMAIL_LIMIT failed logins could still log in')
+    log_in(client, 'user3@example.com')
+    with client.session_transaction() as sess:
+        if sess.get('user_id') != FIRST_USER_ID + 3:
+            errors.append('another email was locked out too')
+
+    # A hasher with one worker and no queue, held busy: the next login must not wait.
+    with app.app_context():
+        method = app.config['PASSWORD_HASH_METHOD']
+        app.extensions['password_hasher'] = hasher = PasswordHasher(method, workers=1, queue=0)
+    release = threading.Event()
+    holder = threading.Thread(target=hasher._run, args=(release.wait,))
+    holder.start()
+    while hasher._slots._value:
+        time.sleep(0.001)
+    started = time.perf_counter()
+    response = log_in(client_from(app, '10.3.0.1'), 'user4@example.com')
+    waited = time.perf_counter() - started
+    release.set()
+    holder.join()
+    if response.status_code != 503 or not response.headers.get('Retry-After'):
+        errors.append(f'a login with the hashing queue full answered {response.status_code}, expected 503')
+    elif waited > 0.5:
+        errors.append(f'a login with the hashing queue full took {waited:.2f}s to be turned away')
+    app.extensions.pop('password_hasher')
+
+    with app.app_context():
+        db.session.get(User, FIRST_USER_ID + 5).password = generate_password_hash(PASSWORD, 'pbkdf2:sha256:1000')
+        db.session.commit()
+    log_in(client_from(app, '10.4.0.1'), 'user5@example.com')
+    with app.app_context():
+        stored = db.session.get(User, FIRST_USER_ID + 5).password
+        if not stored.startswith(method + '$'):
+            errors.append(f'a login kept the old {stored.partition("$")[0]} hash, expected {method}')
+
+
+
+def book_loop(app, user_id, stop, samples):
+    from models import Reservation
+
+    client = app.test_client()
+    login(client, user_id)
+    while not stop.is_set():
+        started = time.perf_counter()
+        booked = client.post('/1/book_spot', data={'vehicle_id': user_id})
+        with app.app_context():
+            booking = Reservation.query.filter_by(vehicle_id=user_id, status='A').first()
+        released = client.post(f'/{booking.id}/release_slot') if booking else None
+        failed = booked.status_code != 302 or released is None or released.status_code != 302
+        samples.append((time.perf_counter() - started, failed))
+
+
+def storm_loop(app, n, stop, statuses):
+    client = client_from(app, f'10.9.{n // 250}.{n % 250 + 1}')
+    while not stop.is_set():
+        statuses.append(log_in(client, f'user{100 + n}@example.com').status_code)
+
+
+def phase(app, args, storm):
+    stop = threading.Event()
+    samples, statuses = [], []
+    threads = [threading.Thread(target=book_loop, args=(app, FIRST_USER_ID + 10 + i, stop, samples)) for i in range(args.bookers)]
+    threads += [threading.Thread(target=storm_loop, args=(app, i, stop, statuses)) for i in range(storm)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    times = sorted(elapsed for elapsed, _ in samples)
+    p95 = statistics.quantiles(times, n=20)[-1] if len(times) > 1 else (times or [0])[0]
+    return {
+        'cycles_per_second': len(samples) / args.seconds,
+        'p95_ms': p95 * 1000,
+        'failed': sum(failed for _, failed in samples),
+        'logins_per_second': statuses.count(302) / args.seconds,
+        'throttled': statuses.count(429),
+        'busy': statuses.count(503),
+    }
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('auth')
+
+    from werkzeug.security import generate_password_hash
+    from models import db, User
+
+    with app.app_context():
+        seed(lots=2, spots=50, users=200, reservations=1000, active=0)
+        User.query.update({'password': generate_password_hash(PASSWORD, app.config['PASSWORD_HASH_METHOD'])})
+        db.session.commit()
+
+    limits = app.config['AUTH_IP_LIMIT'], app.config['AUTH_EMAIL_LIMIT']
+    errors = []
+    check(app, errors)
+    print('throttling and rehash checks done')
+
+    configured = app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_QUEUE'], app.config['PASSWORD_HASH_NICE']
+    workers = configured[0]
+    print(f"\n{'phase':<28} {'bookings/s':>10} {'p95':>9} {'failed':>7} {'logins/s':>9} {'429s':>6} {'503s':>6}")
+    for name, storm, executor, throttle in (
+        ('bookings alone', 0, None, ('', '')),
+        # As wide as the storm and not reniced: as good as hashing in the request thread.
+        ('storm, hashing inline', args.storm, (args.storm, args.storm, 0), ('', '')),
+        (f'storm, {workers} hash workers', args.storm, None, ('', '')),
+        (f'storm, {workers} + throttling', args.storm, None, limits),
+    ):
+        app.extensions.pop('password_hasher', None)
+        app.extensions.pop('auth_limits', None)
+        app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_QUEUE'], app.config['PASSWORD_HASH_NICE'] = executor or configured
+        app.config['AUTH_IP_LIMIT'], app.config['AUTH_EMAIL_LIMIT'] = throttle
+        result = phase(app, args, storm)
+        print(f"{name:<28} {result['cycles_per_second']:>10.1f} {result['p95_ms']:>7.1f}ms {result['failed']:>7}"
+              f" {result['logins_per_second']:>9.1f} {result['throttled']:>6} {result['busy']:>6}")
+        if result['failed']:
+            errors.append(f"{name}: {result['failed']} failed booking cycles")
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('\nOK: throttled, busy and stale-hash logins are handled, bookings keep running through a login storm')
+
+
+if __name__ == '__main__':
+    main()
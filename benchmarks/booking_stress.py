@@ -0,0 +1,138 @@
+"""
+Concurrent booking stress test.
+
+Runs many worker threads that book and release spots through the real
+routes against a throwaway SQLite database, then checks that no spot was
+ever double-booked and that spots, vehicles and reservations agree.
+
+    python benchmarks/booking_stress.py --workers 16 --spots 20 --rounds 25
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+
+from harness import bootstrap, login
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=16, help='concurrent users, one vehicle each')
+    parser.add_argument('--spots', type=int, default=20, help='spots in the contended lot')
+    parser.add_argument('--rounds', type=int, default=25, help='book/release cycles per worker')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    app = bootstrap('stress')
+
+    from models import db, User, Address, Vehicle, ParkingLot, ParkingSpot, Reservation
+    from services import get_lot_grid
+
+    with app.app_context():
+        address = Address(address='Stress Street', city='Stress', state='Stress', pincode='000000')
+        db.session.add(address)
+        db.session.commit()
+
+        lot = ParkingLot(prime_location_name='Stress Lot', address_id=address.id, price_per_hour=10, max_spots=args.spots)
+        db.session.add(lot)
+        db.session.commit()
+        lot_id = lot.id
+
+        db.session.add_all(
+            ParkingSpot(lot_id=lot_id, spot_number=f"LOT{lot_id}-S{i:03d}", status='A')
+            for i in range(1, args.spots + 1)
+        )
+
+        workers = []
+        for i in range(args.workers):
+            user = User(email=f'stress{i}@example.com', password='-', full_name=f'Stress {i}')
+            user.vehicles.append(Vehicle(vehicle_number=f'ST{i:06d}', vehicle_type='Car'))
+            db.session.add(user)
+            workers.append(user)
+        db.session.commit()
+
+        workers = [(user.id, user.vehicles[0].id) for user in workers]
+        first_spot_id = ParkingSpot.query.filter_by(lot_id=lot_id).order_by(ParkingSpot.id).first().id
+
+    statuses = Counter()
+    status_lock = threading.Lock()
+    barrier = threading.Barrier(len(workers))
+
+    def run(user_id, vehicle_id):
+        client = app.test_client()
+        login(client, user_id)
+
+        barrier.wait()
+        for n in range(args.rounds):
+            # Half the bookings fight over the same spot, the rest ask for any spot.
+            if n % 2:
+                response = client.post(f'/book_spot/{first_spot_id}', data={'vehicle_id': vehicle_id})
+            else:
+                response = client.post(f'/{lot_id}/book_spot', data={'vehicle_id': vehicle_id})
+
+            with status_lock:
+                statuses[f'book {response.status_code}'] += 1
+
+            with app.app_context():
+                active = Reservation.query.filter_by(vehicle_id=vehicle_id, status='A').first()
+                booking_id = active.id if active else None
+
+            if booking_id:
+                response = client.post(f'/{booking_id}/release_slot')
+                with status_lock:
+                    statuses[f'release {response.status_code}'] += 1
+
+    threads = [threading.Thread(target=run, args=worker) for worker in workers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    errors = []
+    with app.app_context():
+        reservations = Reservation.query.all()
+
+        # No two reservations of the same spot may overlap in time.
+        by_spot = {}
+        for r in reservations:
+            by_spot.setdefault(r.spot_id, []).append(r)
+        for spot_id, spot_reservations in by_spot.items():
+            spot_reservations.sort(key=lambda r: r.parking_timestamp)
+            for earlier, later in zip(spot_reservations, spot_reservations[1:]):
+                if earlier.leaving_timestamp is None or earlier.leaving_timestamp > later.parking_timestamp:
+                    errors.append(f'spot {spot_id} double-booked by reservations {earlier.id} and {later.id}')
+
+        active = [r for r in reservations if r.status == 'A']
+        occupied = ParkingSpot.query.filter_by(lot_id=lot_id, status='O').count()
+        parked = Vehicle.query.filter_by(is_parked_in=True).count()
+        if not occupied == parked == len(active):
+            errors.append(f'inconsistent state: {occupied} occupied spots, {parked} parked vehicles, {len(active)} active reservations')
+
+        # The in-memory occupancy grid must agree with the table.
+        grid = {spot.id: spot.status for spot in get_lot_grid(lot_id)}
+        table = dict(db.session.query(ParkingSpot.id, ParkingSpot.status).filter_by(lot_id=lot_id))
+        if grid != table:
+            errors.append(f'occupancy grid disagrees with parking_spot on {sum(grid.get(k) != v for k, v in table.items())} spots')
+
+    print(f'{len(workers)} workers x {args.rounds} rounds on {args.spots} spots in {elapsed:.2f}s')
+    print(f'{len(reservations)} reservations, {len(reservations) / elapsed:.1f} bookings/s')
+    for key, count in sorted(statuses.items()):
+        print(f'  {key}: {count}')
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: zero double-bookings')
+
+
+if __name__ == '__main__':
+    main()
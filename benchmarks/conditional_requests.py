@@ -0,0 +1,131 @@
+"""
+Conditional request and compression check.
+
+Fetches the lot views, profile, history and the spots endpoint once, then
+revalidates them with the ETags they were served with, reporting the time
+and SQL statements per full render against per 304. Checks that edits
+through the routes change the validators, that pages with pending flash
+messages or an active booking's running cost are always rendered, and
+reports how much gzip saves on each page.
+
+    python benchmarks/conditional_requests.py --requests 200
+"""
+import argparse
+import gzip
+import sys
+import time
+
+from harness import bootstrap, seed, login, count_queries, ADMIN_ID, FIRST_USER_ID
+
+USER_PAGES = ['/1/view_slot', '/profile', '/history', '/1/spots']
+ADMIN_PAGES = ['/admin/view_lot/1']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='requests per page and mode')
+    return parser.parse_args()
+
+
+def timed(engines, client, url, requests, headers=None):
+    with count_queries(*engines) as statements:
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = client.get(url, headers=headers)
+        elapsed = time.perf_counter() - started
+    return response, elapsed / requests, len(statements) / requests
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('conditional')
+
+    from models import db
+
+    with app.app_context():
+        seed(lots=5, spots=500, users=50, reservations=5000, active=0.2)
+        engines = list(db.engines.values())
+
+    user = app.test_client()
+    login(user, FIRST_USER_ID)
+    admin = app.test_client()
+    login(admin, ADMIN_ID, is_admin=True)
+
+    errors = []
+    etags = {}
+
+    print(f"{'page':<22} {'200 ms':>8} {'304 ms':>8} {'200 sql':>8} {'304 sql':>8} {'bytes':>8} {'gzip':>8}")
+    for client, urls in ((user, USER_PAGES), (admin, ADMIN_PAGES)):
+        for url in urls:
+            full, full_time, full_sql = timed(engines, client, url, args.requests)
+            etag = full.headers.get('ETag')
+            if full.status_code != 200 or not etag:
+                errors.append(f'{url}: expected a 200 with an ETag, got {full.status_code}')
+                continue
+            etags[url] = etag
+
+            cached, cached_time, cached_sql = timed(engines, client, url, args.requests, {'If-None-Match': etag})
+            if cached.status_code != 304 or cached.data:
+                errors.append(f'{url}: revalidating did not answer an empty 304')
+
+            compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+            if compressed.headers.get('Content-Encoding') == 'gzip':
+                if gzip.decompress(compressed.data) != full.data:
+                    errors.append(f'{url}: gzip body does not match the page')
+                revalidated = client.get(url, headers={'If-None-Match': compressed.headers['ETag']})
+                if revalidated.status_code != 304:
+                    errors.append(f'{url}: the compressed ETag does not revalidate')
+            elif len(full.data) >= app.config['COMPRESS_MIN_SIZE']:
+                errors.append(f'{url}: {len(full.data)} byte page was not compressed')
+
+            print(f'{url:<22} {full_time * 1000:>8.2f} {cached_time * 1000:>8.2f} {full_sql:>8.1f} '
+                  f'{cached_sql:>8.1f} {len(full.data):>8} {len(compressed.data):>8}')
+
+    # Every change a page shows must change its validator.
+    def changed(client, url, label):
+        response = client.get(url, headers={'If-None-Match': etags[url]})
+        if response.status_code != 200:
+            errors.append(f'{url} still answered 304 after {label}')
+        etags[url] = response.headers.get('ETag')
+
+    user.post('/edit_address', data={'house_number': '1', 'address': 'New Road', 'city': 'Pune',
+                                     'district': 'Pune', 'pincode': '411001', 'state': 'MH', 'country': 'India'})
+    changed(user, '/profile', 'an address edit')
+
+    user.post('/add_vehicle', data={'vehicle_number': 'NEW0001', 'vehicle_type': 'Bike'})
+    changed(user, '/profile', 'adding a vehicle')
+    changed(user, '/1/view_slot', 'adding a vehicle')
+
+    user.post('/1/book_spot', data={'vehicle_id': FIRST_USER_ID})
+    changed(user, '/history', 'a booking')
+    changed(user, '/1/spots', 'a booking')
+    # An active booking's running duration and cost change by the minute.
+    if etags['/history'] is not None:
+        errors.append('/history was served with an ETag while a booking is active')
+
+    admin.post('/admin/editLot/1', data={'locName': 'Renamed', 'address': 'Lot Road', 'city': 'Pune',
+                                         'pincode': '411001', 'state': 'MH', 'price': '25', 'maxSpots': '500'})
+    changed(user, '/history', 'a lot edit')
+
+    # The edit left a flash message behind: the next page must show it.
+    response = admin.get('/admin/view_lot/1', headers={'If-None-Match': etags['/admin/view_lot/1']})
+    if response.status_code != 200 or b'updated successfully' not in response.data:
+        errors.append('a page with a pending flash message was answered with 304')
+    changed(admin, '/admin/view_lot/1', 'a lot edit')
+
+    stream = user.get('/events/occupancy?lot=1', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    if 'Content-Encoding' in stream.headers:
+        errors.append('the occupancy event stream was compressed')
+    stream.close()
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: unchanged pages revalidate with 304, changes and flashes render in full')
+
+
+if __name__ == '__main__':
+    main()
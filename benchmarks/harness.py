@@ -0,0 +1,140 @@
+"""
+Shared helpers for the scripts in this directory: a throwaway database,
+a bulk seeder and a SQL statement counter.
+"""
+import os
+import random
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bootstrap(name):
+    """
+    Points a new app at a fresh SQLite file and creates its schema. Must
+    run before anything imports `config`. Returns the Flask app.
+    """
+    db_dir = tempfile.mkdtemp(prefix=f'parkedin-{name}-')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(db_dir, f'{name}.sqlite3')}"
+    os.environ.setdefault('SECRET_KEY', name)
+    sys.path.insert(0, ROOT)
+
+    from app import create_app
+    from models import init_db
+
+    app = create_app()
+    with app.app_context():
+        init_db()
+    return app
+
+
+def login(client, user_id, is_admin=False):
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['is_admin'] = is_admin
+
+
+# --------------------------
+# Seeding
+# --------------------------
+ADMIN_ID = 1
+FIRST_USER_ID = 100
+
+
+def seed(lots=50, spots=200, users=2000, reservations=100000, active=0.2, seed=7):
+    """
+    Bulk-inserts lots with spots, users with one vehicle and an address each,
+    and released reservations spread over the past year. A share `active`
+    of the users ends up currently parked on a distinct spot.
+    """
+    from models import db, Address, User, Vehicle, ParkingLot, ParkingSpot, Reservation
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    db.session.execute(Address.__table__.insert(), [
+        {'id': 1000 + i, 'address': f'{i} Main Road', 'city': f'City{i % 10}', 'state': f'State{i % 4}',
+         'country': 'India', 'pincode': f'{400000 + i:06d}'}
+        for i in range(lots + users)
+    ])
+    db.session.execute(ParkingLot.__table__.insert(), [
+        {'id': i + 1, 'prime_location_name': f'Lot {i}', 'address_id': 1000 + i,
+         'price_per_hour': 10 + i % 40, 'max_spots': spots, 'created_at': now, 'updated_at': now}
+        for i in range(lots)
+    ])
+    db.session.execute(ParkingSpot.__table__.insert(), [
+        {'lot_id': lot_id, 'spot_number': f'LOT{lot_id}-S{n:03d}', 'status': 'A', 'created_at': now, 'updated_at': now}
+        for lot_id in range(1, lots + 1) for n in range(1, spots + 1)
+    ])
+    db.session.execute(User.__table__.insert(), [
+        {'id': FIRST_USER_ID + i, 'email': f'user{i}@example.com', 'password': '-', 'is_admin': False,
+         'full_name': f'User {i}', 'address_id': 1000 + lots + i,
+         'registered_at': now - timedelta(days=i % 365), 'updated_at': now}
+        for i in range(users)
+    ])
+    db.session.execute(Vehicle.__table__.insert(), [
+        {'id': FIRST_USER_ID + i, 'user_id': FIRST_USER_ID + i, 'vehicle_number': f'VH{i:06d}', 'vehicle_type': 'Car',
+         'is_parked_in': False, 'added_at': now, 'updated_at': now}
+        for i in range(users)
+    ])
+
+    spot_count = lots * spots
+    rows = []
+    for _ in range(reservations):
+        user_id = FIRST_USER_ID + rng.randrange(users)
+        parked_at = now - timedelta(days=1, minutes=rng.randrange(60 * 24 * 364))
+        hours = rng.randint(1, 12)
+        rows.append({
+            'user_id': user_id, 'spot_id': 1 + rng.randrange(spot_count), 'vehicle_id': user_id, 'status': 'R',
+            'parking_timestamp': parked_at, 'leaving_timestamp': parked_at + timedelta(hours=hours),
+            'parking_cost': hours * 20.0,
+        })
+
+    parked_users = rng.sample(range(users), min(int(users * active), spot_count))
+    parked_spots = rng.sample(range(1, spot_count + 1), len(parked_users))
+    for i, spot_id in zip(parked_users, parked_spots):
+        rows.append({
+            'user_id': FIRST_USER_ID + i, 'spot_id': spot_id, 'vehicle_id': FIRST_USER_ID + i, 'status': 'A',
+            'parking_timestamp': now - timedelta(minutes=rng.randrange(1, 600)),
+            'leaving_timestamp': None, 'parking_cost': None,
+        })
+    if rows:
+        db.session.execute(Reservation.__table__.insert(), rows)
+
+    if parked_spots:
+        ParkingSpot.query.filter(ParkingSpot.id.in_(parked_spots)).update({'status': 'O'}, synchronize_session=False)
+        Vehicle.query.filter(Vehicle.id.in_([FIRST_USER_ID + i for i in parked_users])).update(
+            {'is_parked_in': True}, synchronize_session=False
+        )
+    db.session.commit()
+
+
+# --------------------------
+# Statement Counting
+# --------------------------
+@contextmanager
+def count_queries(*engines):
+    """
+    Counts the SQL statements run on `engines` inside the block:
+
+        with count_queries(*db.engines.values()) as statements:
+            client.get('/history')
+        assert len(statements) <= 8
+    """
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,173 @@
+"""
+Load test over every user-facing and admin route.
+
+Seeds a synthetic dataset (the same generator as `flask seed-synthetic`),
+then has each worker run the full route mix -- home, search, lot and spot
+views, book, release, profile, history, both summaries and the admin
+lists -- through its own test client, once sequentially and then at each
+concurrency level. Reports throughput, p50/p95/p99 latency and errors per
+route, so a change can be compared against the numbers before it.
+
+    python benchmarks/load_test.py --workers 1,4,8 --iterations 20
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from harness import bootstrap, login, ADMIN_ID
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=50)
+    parser.add_argument('--spots', type=int, default=200)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--reservations', type=int, default=200000)
+    parser.add_argument('--workers', default='1,4,8', help='comma-separated concurrency levels')
+    parser.add_argument('--iterations', type=int, default=20, help='passes over the route mix per worker')
+    return parser.parse_args()
+
+
+def user_routes(lot_id):
+    return [
+        ('home', '/'),
+        ('search', '/?query=Mumbai'),
+        ('view_slot', f'/{lot_id}/view_slot'),
+        ('spots', f'/{lot_id}/spots'),
+        ('profile', '/profile'),
+        ('history', '/history'),
+        ('history search', '/history?query=MH'),
+        ('user summary', '/summary?days=30'),
+    ]
+
+
+def admin_routes(lot_id):
+    return [
+        ('admin home', '/admin/'),
+        ('admin search', '/admin/?query=Pune'),
+        ('admin view_lot', f'/admin/view_lot/{lot_id}'),
+        ('admin users', '/admin/users'),
+        ('admin user search', '/admin/users?query=Patel'),
+        ('admin reservations', '/admin/reservations'),
+        ('admin summary', '/admin/summary?days=30'),
+    ]
+
+
+class Worker(threading.Thread):
+    def __init__(self, app, user_id, vehicle_id, lot_id, iterations, results):
+        super().__init__(daemon=True)
+        self.app = app
+        self.user_id = user_id
+        self.vehicle_id = vehicle_id
+        self.lot_id = lot_id
+        self.iterations = iterations
+        self.results = results
+
+    def timed(self, name, call, ok):
+        started = time.perf_counter()
+        try:
+            response = call()
+            failed = not ok(response)
+        except Exception:
+            response, failed = None, True
+        self.results[name].append((time.perf_counter() - started, failed))
+        return response
+
+    def run(self):
+        from models import Reservation
+
+        user = self.app.test_client()
+        login(user, self.user_id)
+        admin = self.app.test_client()
+        login(admin, ADMIN_ID, is_admin=True)
+
+        for _ in range(self.iterations):
+            for client, routes in ((user, user_routes(self.lot_id)), (admin, admin_routes(self.lot_id))):
+                for name, url in routes:
+                    self.timed(name, lambda: client.get(url), lambda response: response.status_code == 200)
+
+            self.timed(
+                'book', lambda: user.post(f'/{self.lot_id}/book_spot', data={'vehicle_id': self.vehicle_id}),
+                lambda response: response.status_code == 302 and response.location.endswith('/'),
+            )
+            with self.app.app_context():
+                booking = Reservation.query.filter_by(vehicle_id=self.vehicle_id, status='A').first()
+            if booking is not None:
+                self.timed(
+                    'release', lambda: user.post(f'/{booking.id}/release_slot'),
+                    lambda response: response.status_code == 302,
+                )
+
+
+def percentile(quantiles, p):
+    return quantiles[p - 1] * 1000
+
+
+def report(workers, results, elapsed):
+    total = sum(len(samples) for samples in results.values())
+    print(f'\n{workers} worker(s): {total} requests in {elapsed:.2f}s, {total / elapsed:.1f} req/s')
+    print(f"{'route':<20} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    errors = 0
+    for name, samples in results.items():
+        latencies = sorted(latency for latency, _ in samples)
+        failed = sum(1 for _, failed in samples if failed)
+        errors += failed
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        print(f'{name:<20} {len(samples):>6} {failed:>6} {percentile(quantiles, 50):>8.1f} '
+              f'{percentile(quantiles, 95):>8.1f} {percentile(quantiles, 99):>8.1f}')
+    return errors
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('loadtest')
+    levels = [int(level) for level in args.workers.split(',')]
+
+    from models import db, Vehicle, Reservation
+    from services import seed_synthetic, rebuild_lot_grids
+    from sqlalchemy import select
+
+    with app.app_context():
+        started = time.perf_counter()
+        added = seed_synthetic(args.lots, args.spots, args.users, args.reservations, seed=7)
+        rebuild_lot_grids()
+        print(f"Seeded {', '.join(f'{count} {table}' for table, count in added.items())} "
+              f'in {time.perf_counter() - started:.1f}s')
+
+        # Each worker books with its own user's free vehicle, so the workers
+        # compete for spots but never for a vehicle.
+        parked = select(Reservation.user_id).where(Reservation.status == 'A')
+        drivers = db.session.execute(
+            select(Vehicle.user_id, Vehicle.id)
+            .where(Vehicle.is_parked_in == False, Vehicle.user_id.not_in(parked))
+            .group_by(Vehicle.user_id)
+            .limit(max(levels))
+        ).all()
+
+    # One unrecorded pass first, so cold caches do not land in the percentiles.
+    Worker(app, *drivers[0], 1, 1, defaultdict(list)).run()
+
+    errors = 0
+    for workers in levels:
+        results = defaultdict(list)
+        threads = [
+            Worker(app, user_id, vehicle_id, 1 + n % args.lots, args.iterations, results)
+            for n, (user_id, vehicle_id) in enumerate(drivers[:workers])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        errors += report(workers, results, time.perf_counter() - started)
+
+    if errors:
+        print(f'\n{errors} requests failed')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
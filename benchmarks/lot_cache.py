@@ -0,0 +1,103 @@
+"""
+Lot listing and fragment cache benchmark.
+
+Renders the home page and lot searches repeatedly with no caching, with
+the listing cache only, and with the rendered-fragment cache on top,
+reporting requests per second, SQL statements per request and each
+cache's hit/miss stats. Also checks that editing a lot through the admin
+routes and booking a spot both show up on the next request, and that a
+listing loaded while the cache was cleared is not kept.
+
+    python benchmarks/lot_cache.py --requests 500
+"""
+import argparse
+import sys
+import time
+
+from harness import bootstrap, seed, login, count_queries, ADMIN_ID, FIRST_USER_ID
+
+URLS = ['/', '/?query=City1', '/?query=Lot', '/?per_page=50']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=500, help='requests per run')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('lotcache')
+
+    from models import db
+    from services import lot_cache, fragment_cache
+    from services.cache import StatsCache
+
+    with app.app_context():
+        seed(lots=args.lots, spots=10, users=10, reservations=0, active=0)
+        engines = list(db.engines.values())
+
+    # Anonymous visitors: the page is the lot list and nothing else.
+    client = app.test_client()
+
+    runs = (
+        ('uncached', 0, 0),
+        ('listings', app.config['LOT_CACHE_SIZE'], 0),
+        ('fragments', app.config['LOT_CACHE_SIZE'], app.config['FRAGMENT_CACHE_SIZE']),
+    )
+    results = {}
+    for label, lot_size, fragment_size in runs:
+        app.config['LOT_CACHE_SIZE'] = lot_size
+        app.config['FRAGMENT_CACHE_SIZE'] = fragment_size
+        app.extensions.pop('lot_cache', None)
+        app.extensions.pop('fragment_cache', None)
+
+        with count_queries(*engines) as statements:
+            started = time.perf_counter()
+            for n in range(args.requests):
+                client.get(URLS[n % len(URLS)])
+            elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            lots, fragments = lot_cache().stats(), fragment_cache().stats()
+        results[label] = args.requests / elapsed
+        print(f'{label:>9}: {args.requests / elapsed:7.1f} req/s, '
+              f'{len(statements) / args.requests:.2f} statements/request, '
+              f"listing hits/misses {lots['hits']}/{lots['misses']}, "
+              f"fragment hits/misses {fragments['hits']}/{fragments['misses']}")
+
+    for label in ('listings', 'fragments'):
+        print(f"speedup with {label}: {results[label] / results['uncached']:.2f}x")
+
+    login(client, ADMIN_ID, is_admin=True)
+    client.post('/admin/editLot/1', data={
+        'locName': 'Renamed Lot', 'address': '1 Main Road', 'city': 'City1', 'pincode': '400001',
+        'state': 'State1', 'price': '15', 'maxSpots': '10',
+    })
+    if 'Renamed Lot' not in app.test_client().get('/').text:
+        print('FAILED: lot edit not visible after invalidation')
+        sys.exit(1)
+
+    login(client, FIRST_USER_ID)
+    client.post('/1/book_spot', data={'vehicle_id': FIRST_USER_ID})
+    if '9 / 10' not in app.test_client().get('/').text.split('Renamed Lot')[1][:2000]:
+        print('FAILED: booking not visible in the cached lot card')
+        sys.exit(1)
+
+    # An edit commits and clears the cache while a request is still loading.
+    cache = StatsCache(maxsize=10, ttl=60)
+
+    def load_during_edit():
+        cache.clear()
+        return 'before edit'
+    cache.get('page', load_during_edit)
+    if cache.get('page', lambda: 'after edit') != 'after edit':
+        print('FAILED: a listing loaded across a clear() was stored')
+        sys.exit(1)
+
+    print('OK: lot edits and bookings invalidate the cached listings and cards')
+
+
+if __name__ == '__main__':
+    main()
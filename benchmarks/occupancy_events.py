@@ -0,0 +1,129 @@
+"""
+Live occupancy fan-out check.
+
+Serves the app on a local port, opens many /events/occupancy streams,
+then books and releases spots through the routes. Checks that every
+stream received every change in order and that a stream past
+EVENTS_MAX_SUBSCRIBERS is turned away with 503, and reports how long
+events took to reach the subscribers.
+
+    python benchmarks/occupancy_events.py --subscribers 200 --bookings 50
+"""
+import argparse
+import http.client
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+
+from harness import bootstrap, seed, login, FIRST_USER_ID
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--subscribers', type=int, default=200)
+    parser.add_argument('--bookings', type=int, default=50, help='book/release cycles')
+    return parser.parse_args()
+
+
+def subscribe(port, received, ready):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', '/events/occupancy?lot=1')
+    response = connection.getresponse()
+    ready.release()
+
+    data = None
+    for line in response:
+        line = line.decode().rstrip('\n')
+        if line.startswith('data: '):
+            data = json.loads(line[6:])
+        elif not line and data is not None:
+            received.append((time.perf_counter(), data))
+            data = None
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('events')
+    app.config['EVENTS_MAX_SUBSCRIBERS'] = args.subscribers
+
+    from werkzeug.serving import make_server
+    from models import Reservation
+    from services import occupancy_events
+
+    with app.app_context():
+        seed(lots=1, spots=args.bookings, users=args.bookings, reservations=0, active=0)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    streams = [[] for _ in range(args.subscribers)]
+    ready = threading.Semaphore(0)
+    for received in streams:
+        threading.Thread(target=subscribe, args=(server.port, received, ready), daemon=True).start()
+    for _ in streams:
+        ready.acquire()
+    while len(occupancy_events) < args.subscribers:
+        time.sleep(0.01)
+
+    connection = http.client.HTTPConnection('127.0.0.1', server.port)
+    connection.request('GET', '/events/occupancy')
+    extra = connection.getresponse()
+    refused = extra.status == 503 and extra.getheader('Retry-After')
+    connection.close()
+
+    client = app.test_client()
+    published = []
+    started = time.perf_counter()
+    for i in range(args.bookings):
+        user_id = FIRST_USER_ID + i
+        login(client, user_id)
+        published.append(time.perf_counter())
+        client.post('/1/book_spot', data={'vehicle_id': user_id})
+    for i in range(args.bookings):
+        with app.app_context():
+            booking_id = Reservation.query.filter_by(user_id=FIRST_USER_ID + i, status='A').one().id
+        login(client, FIRST_USER_ID + i)
+        published.append(time.perf_counter())
+        client.post(f'/{booking_id}/release_slot')
+    elapsed = time.perf_counter() - started
+
+    expected = len(published)
+    deadline = time.perf_counter() + 10
+    while any(len(received) < expected for received in streams) and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    server.shutdown()
+
+    errors = []
+    if not refused:
+        errors.append(f'stream {args.subscribers + 1} answered {extra.status}, expected 503 with Retry-After')
+    latencies = []
+    for n, received in enumerate(streams):
+        if len(received) != expected:
+            errors.append(f'stream {n} got {len(received)} of {expected} events')
+            continue
+        available = [data['available'] for _, data in received]
+        if available != list(range(args.bookings - 1, -1, -1)) + list(range(1, args.bookings + 1)):
+            errors.append(f'stream {n} saw the counts out of order')
+        latencies.extend(at - sent for (at, _), sent in zip(received, published))
+
+    print(f'{args.subscribers} streams x {expected} changes in {elapsed:.2f}s')
+    if latencies:
+        latencies.sort()
+        print(f'delivery latency: p50 {statistics.median(latencies) * 1000:.1f} ms, '
+              f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms')
+
+    if errors:
+        print('FAILED')
+        for error in errors[:20]:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: every stream received every change in order')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Occupancy grid check across worker processes.
+
+Loads the spot grids in this process, then books spots from a second
+process, as another gunicorn worker would, and checks that within
+OCCUPANCY_TTL this process serves the new statuses and counts on the
+spots endpoint and the home page, and that it does not reload grids
+nobody else changed.
+
+    python benchmarks/occupancy_workers.py --bookings 3
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+from harness import bootstrap, seed, login, FIRST_USER_ID
+
+LOT_ID = 2
+SPOTS = 10
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=3, help='spots the other worker books')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_worker(args):
+    """The other worker: books spots of the lot from its own app and grids."""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app import create_app
+
+    app = create_app()
+    for i in range(args.bookings):
+        client = app.test_client()
+        login(client, FIRST_USER_ID + i)
+        if client.post(f'/{LOT_ID}/book_spot', data={'vehicle_id': FIRST_USER_ID + i}).status_code != 302:
+            sys.exit(f'booking {i} failed')
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        return run_worker(args)
+
+    app = bootstrap('workers')
+    ttl = app.config['OCCUPANCY_TTL']
+
+    from sqlalchemy import event
+    from models import db
+
+    with app.app_context():
+        seed(lots=3, spots=SPOTS, users=10, reservations=10, active=0)
+        engine = db.engine
+
+    client = app.test_client()
+    login(client, FIRST_USER_ID + 9)
+
+    def statuses():
+        return client.get(f'/{LOT_ID}/spots').get_json()['statuses']
+
+    def counts():
+        return re.findall(r'(\d+) / (\d+)', client.get('/').get_data(as_text=True))
+
+    errors = []
+    before = statuses()
+    counts()
+
+    # Nothing changed: past the TTL, a check runs but no grid is reloaded.
+    time.sleep(ttl)
+    loads = []
+    event.listen(engine, 'before_cursor_execute', lambda conn, cursor, statement, *rest: loads.append(statement))
+    statuses()
+    reloads = [statement for statement in loads if 'spot_number' in statement]
+    if reloads:
+        errors.append('an unchanged grid was reloaded')
+
+    subprocess.run([sys.executable, '-W', 'ignore', __file__, '--worker', '--bookings', str(args.bookings)], check=True)
+    time.sleep(ttl)
+
+    after = statuses()
+    booked = after.count('O') - before.count('O')
+    if booked != args.bookings:
+        errors.append(f'/{LOT_ID}/spots shows {booked} new bookings ({before} -> {after}), expected {args.bookings}')
+    expected = (str(SPOTS - args.bookings), str(SPOTS))
+    if expected not in counts():
+        errors.append(f'the home page does not show {expected[0]} / {expected[1]} free for lot {LOT_ID}')
+
+    print(f'lot {LOT_ID}: {before} -> {after}')
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print(f'OK: bookings made by another process show up within OCCUPANCY_TTL ({ttl:g}s)')
+
+
+if __name__ == '__main__':
+    main()
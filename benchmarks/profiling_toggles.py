@@ -0,0 +1,118 @@
+"""
+Slow-query log and sampling profiler check.
+
+Turns the slow-query log on with a threshold every statement crosses and
+checks each logged entry names the route and carries its parameters, then
+raises the threshold and checks the log goes quiet. Turns the profiler on
+for 1 in N requests and checks the right number of collapsed-stack files
+appear, that they parse, and how much the sampled requests slowed down.
+
+    python benchmarks/profiling_toggles.py --requests 100 --rate 10
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from harness import bootstrap, seed, login, FIRST_USER_ID
+
+URLS = ['/profile', '/history', '/summary', '/1/view_slot']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--rate', type=int, default=10, help='profile 1 in this many requests')
+    return parser.parse_args()
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def drive(client, requests):
+    started = time.perf_counter()
+    for n in range(requests):
+        client.get(URLS[n % len(URLS)])
+    return time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('profiling')
+
+    from services import slow_query_log
+
+    with app.app_context():
+        seed(lots=10, spots=100, users=200, reservations=20000, active=0.2)
+
+    client = app.test_client()
+    login(client, FIRST_USER_ID)
+    errors = []
+
+    collect = Collect()
+    slow_query_log.addHandler(collect)
+    slow_query_log.propagate = False
+
+    app.config['SLOW_QUERY_MS'] = 0.0001
+    client.get('/history?query=VH')
+    if not collect.messages:
+        errors.append('no statement was logged with a threshold every statement crosses')
+    for message in collect.messages:
+        if 'GET /history?query=VH (user.history)' not in message or 'params' not in message:
+            errors.append(f'log entry without its route or parameters: {message[:200]!r}')
+            break
+    print(f'{len(collect.messages)} statements logged for /history?query=VH')
+
+    collect.messages.clear()
+    app.config['SLOW_QUERY_MS'] = 60000
+    drive(client, len(URLS))
+    if collect.messages:
+        errors.append(f'{len(collect.messages)} statements logged under a one minute threshold')
+    app.config['SLOW_QUERY_MS'] = 0
+
+    plain = drive(client, args.requests)
+
+    directory = tempfile.mkdtemp(prefix='parkedin-profiles-')
+    app.config['PROFILE_DIR'] = directory
+    app.config['PROFILE_SAMPLE_RATE'] = args.rate
+    profiled = drive(client, args.requests)
+    app.config['PROFILE_SAMPLE_RATE'] = 0
+
+    files = os.listdir(directory)
+    if len(files) != args.requests // args.rate:
+        errors.append(f'{len(files)} profiles written for {args.requests} requests at 1 in {args.rate}')
+
+    samples = 0
+    for name in files:
+        with open(os.path.join(directory, name)) as profile:
+            for line in profile:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if not stack or not count.isdigit():
+                    errors.append(f'{name}: not a collapsed stack line: {line!r}')
+                    break
+                samples += int(count)
+    if files and not samples:
+        errors.append('the profiles hold no samples')
+
+    print(f'{len(files)} profiles, {samples} stack samples, written to {directory}')
+    print(f'{args.requests} requests: {plain:.2f}s unprofiled, {profiled:.2f}s with 1 in {args.rate} profiled')
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: both switch on and off from the config')
+
+
+if __name__ == '__main__':
+    main()
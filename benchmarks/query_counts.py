@@ -0,0 +1,92 @@
+"""
+SQL statement budget per page.
+
+Seeds a throwaway SQLite database, renders every page through the Flask
+test client and counts the statements each one issues. Exits non-zero if
+a page goes over its budget, which is how N+1 lazy loads show up: the
+count then grows with the number of rows on the page.
+
+    python benchmarks/query_counts.py
+"""
+import argparse
+import sys
+
+from harness import bootstrap, seed, login, count_queries, ADMIN_ID
+
+# Upper bound on statements per page, independent of the data size.
+BUDGETS = {
+    '/admin/': 4,
+    '/admin/?query=City1': 4,
+    '/admin/addLot': 1,
+    '/admin/editLot/1': 2,
+    '/admin/view_lot/1': 2,
+    '/admin/spot/{spot_id}/details': 3,
+    '/admin/users': 4,
+    '/admin/users?query=user1': 4,
+    '/admin/reservations': 3,
+    '/admin/reservations?query=City1': 3,
+    '/admin/summary': 6,
+    '/': 6,
+    '/?query=City1': 6,
+    '/{lot_id}/view_slot': 3,
+    '/{lot_id}/spots': 2,
+    '/{lot_id}/spots?start=50&count=1000': 2,
+    '/profile': 5,
+    '/history': 3,
+    '/history?query=VH': 3,
+    '/summary': 6,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=30)
+    parser.add_argument('--spots', type=int, default=100, help='spots per lot')
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--reservations', type=int, default=20000)
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every statement of pages over budget')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('counts')
+
+    from models import db, Reservation
+
+    with app.app_context():
+        seed(lots=args.lots, spots=args.spots, users=args.users, reservations=args.reservations, active=0.5)
+        parked = Reservation.query.filter_by(status='A').order_by(Reservation.user_id).first()
+        user_id = parked.user_id
+        lot_id = parked.spot.lot_id
+        spot_id = parked.spot_id
+
+    client = app.test_client()
+    failures = []
+
+    for url, budget in BUDGETS.items():
+        url = url.format(lot_id=lot_id, spot_id=spot_id)
+        login(client, ADMIN_ID if url.startswith('/admin') else user_id, is_admin=url.startswith('/admin'))
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        with count_queries(*engines) as statements:
+            response = client.get(url)
+
+        status = 'ok' if len(statements) <= budget else 'OVER'
+        print(f'{status:>4}  {len(statements):>4} / {budget:<3} {response.status_code}  {url}')
+        if response.status_code != 200 or len(statements) > budget:
+            failures.append(url)
+            if args.verbose:
+                for statement in statements:
+                    print('        ' + ' '.join(statement.split())[:160])
+
+    if failures:
+        print(f'FAILED: {len(failures)} page(s) over budget or not 200')
+        sys.exit(1)
+
+    print('OK: every page within its statement budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Query plan regression check.
+
+Seeds a throwaway SQLite database, drives every route through the Flask
+test client while recording the SQL it issues, then runs EXPLAIN QUERY
+PLAN on each statement. Exits non-zero if any statement falls back to a
+full table scan that is not explicitly allowed below.
+
+    python benchmarks/query_plans.py --lots 50 --spots 200 --reservations 100000
+"""
+import argparse
+import re
+import sys
+
+from harness import bootstrap, seed, login, ADMIN_ID
+
+# Full scans that are inherent to what the endpoint shows, with the reason.
+ALLOWED_SCANS = {
+    ('admin.index', 'parking_lot'): 'lists every lot',
+    ('user.index', 'parking_lot'): 'lists every lot',
+    ('admin.summary', 'daily_lot_stats'): 'totals the lots x days rollup',
+}
+
+SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=50)
+    parser.add_argument('--spots', type=int, default=200, help='spots per lot')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--reservations', type=int, default=100000)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('plans')
+
+    from flask import request, has_request_context
+    from sqlalchemy import event
+    from models import db, Vehicle, Reservation
+    from services import backfill_daily_stats
+
+    with app.app_context():
+        seed(lots=args.lots, spots=args.spots, users=args.users, reservations=args.reservations)
+        backfill_daily_stats()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        user_id = Vehicle.query.filter_by(is_parked_in=False).first().user_id
+
+        statements = {}
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if executemany or not has_request_context() or statement.lstrip().upper().startswith('INSERT'):
+                return
+            statements.setdefault((request.endpoint, statement), parameters)
+
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', record)
+
+    client = app.test_client()
+
+    login(client, ADMIN_ID, is_admin=True)
+    for url in ['/admin/', '/admin/?query=City1', '/admin/addLot', '/admin/editLot/1', '/admin/view_lot/1',
+                '/admin/spot/1/details', '/admin/users', '/admin/users?query=user1', '/admin/reservations',
+                '/admin/reservations?query=Lot', '/admin/summary', '/admin/summary?days=365']:
+        client.get(url)
+
+    login(client, user_id)
+    for url in ['/', '/?query=City1', '/1/view_slot', '/1/spots', '/1/spots?start=100', '/profile', '/history',
+                '/history?query=VH', '/summary', '/summary?days=365']:
+        client.get(url)
+    client.post('/book_spot/1', data={'vehicle_id': user_id})
+    client.post('/1/book_spot', data={'vehicle_id': user_id})
+    with app.app_context():
+        booking = Reservation.query.filter_by(user_id=user_id, status='A').first()
+    if booking:
+        client.post(f'/{booking.id}/release_slot')
+
+    tables = set(db.metadata.tables)
+    failures = []
+    with app.app_context():
+        raw = db.engine.raw_connection()
+        try:
+            for (endpoint, statement), parameters in statements.items():
+                for row in raw.execute(f'EXPLAIN QUERY PLAN {statement}', parameters):
+                    match = SCAN.match(row[-1])
+                    if match and match.group(1) in tables and (endpoint, match.group(1)) not in ALLOWED_SCANS:
+                        failures.append((endpoint, match.group(1), ' '.join(statement.split())))
+        finally:
+            raw.close()
+
+    print(f'Checked {len(statements)} statements from {len({e for e, _ in statements})} endpoints.')
+    if failures:
+        print('FAILED: full table scans')
+        for endpoint, table, statement in failures:
+            print(f'  [{endpoint}] SCAN {table}: {statement[:200]}')
+        sys.exit(1)
+
+    print('OK: no unexpected full table scans')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Read/write routing check.
+
+Records which engine every statement runs on and checks that the
+@read_replica pages read from the replica, that bookings write to the
+primary, that a client's first pages after its own write read from the
+primary until DB_READ_YOUR_WRITES runs out, and that the replica refuses
+writes. Then runs the sqlite_concurrency workload with routing off and on.
+
+    python benchmarks/read_routing.py --seconds 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from harness import bootstrap, seed, login, FIRST_USER_ID, ADMIN_ID
+
+REPLICA_PAGES = ['/', '/history', '/summary']
+ADMIN_REPLICA_PAGES = ['/admin/', '/admin/users', '/admin/reservations', '/admin/summary']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=4, help='length of each concurrency phase')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('routing')
+    app.config['DB_READ_YOUR_WRITES'] = 0.5
+
+    from sqlalchemy import event, text
+    from models import db, REPLICA
+
+    with app.app_context():
+        seed(lots=5, spots=50, users=20, reservations=2000, active=0)
+        primary, replica = db.engines[None], db.engines[REPLICA]
+
+    ran_on = []
+    for engine, name in ((primary, 'primary'), (replica, 'replica')):
+        event.listen(engine, 'before_cursor_execute', lambda *args, name=name: ran_on.append(name))
+
+    def engines_for(client, method, url, **kwargs):
+        ran_on.clear()
+        getattr(client, method)(url, **kwargs)
+        return set(ran_on)
+
+    errors = []
+    user = app.test_client()
+    login(user, FIRST_USER_ID)
+    admin = app.test_client()
+    login(admin, ADMIN_ID, is_admin=True)
+
+    for client, urls in ((user, REPLICA_PAGES), (admin, ADMIN_REPLICA_PAGES)):
+        for url in urls:
+            # Cached pages may run nothing at all; what matters is that
+            # nothing runs on the primary.
+            used = engines_for(client, 'get', url)
+            if not used <= {'replica'}:
+                errors.append(f'{url} ran on {sorted(used)}, expected the replica only')
+
+    used = engines_for(user, 'post', '/1/book_spot', data={'vehicle_id': FIRST_USER_ID})
+    if 'primary' not in used:
+        errors.append(f'booking ran on {sorted(used)}')
+
+    used = engines_for(user, 'get', '/history')
+    if used != {'primary'}:
+        errors.append(f'/history right after a booking ran on {sorted(used)}, expected the primary')
+    elif b'LOT1-S' not in user.get('/history').data:
+        errors.append('/history right after a booking does not show it')
+
+    time.sleep(app.config['DB_READ_YOUR_WRITES'])
+    used = engines_for(user, 'get', '/history')
+    if used != {'replica'}:
+        errors.append(f'/history after DB_READ_YOUR_WRITES ran on {sorted(used)}, expected the replica')
+
+    with replica.connect() as connection:
+        try:
+            connection.execute(text("UPDATE parking_lot SET max_spots = max_spots"))
+            errors.append('the replica accepted a write')
+        except Exception:
+            pass
+
+    print('engine routing checks done')
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sqlite_concurrency.py')
+    for routing in ('0', '1'):
+        print(f'\nDB_READ_ROUTING={routing}')
+        subprocess.run(
+            [sys.executable, '-W', 'ignore', script, '--profiles', 'production', '--seconds', str(args.seconds)],
+            env=dict(os.environ, DB_READ_ROUTING=routing), check=True,
+        )
+
+    print('\nOK: reads go to the replica, writes and read-your-writes to the primary')
+
+
+if __name__ == '__main__':
+    main()
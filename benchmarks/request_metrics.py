@@ -0,0 +1,115 @@
+"""
+Request instrumentation check.
+
+Drives a mix of user and admin pages, then scrapes /metrics and checks the
+request counts and per-request SQL statement totals against what was sent
+and what the engine actually ran. Also checks the Server-Timing header is
+only sent when SERVER_TIMING is on, and reports the overhead of the
+instrumentation by timing the same mix with it unhooked.
+
+    python benchmarks/request_metrics.py --rounds 50
+"""
+import argparse
+import re
+import sys
+import time
+
+from harness import bootstrap, seed, login, count_queries, ADMIN_ID, FIRST_USER_ID
+
+USER_PAGES = ['/', '/1/view_slot', '/profile', '/history', '/summary']
+ADMIN_PAGES = ['/admin/', '/admin/users', '/admin/reservations', '/admin/summary']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50, help='passes over every page')
+    return parser.parse_args()
+
+
+def drive(user, admin, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for url in USER_PAGES:
+            user.get(url)
+        for url in ADMIN_PAGES:
+            admin.get(url)
+    return time.perf_counter() - started
+
+
+def scrape(client):
+    samples = {}
+    for line in client.get('/metrics').get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('metrics')
+
+    from models import db
+    from services.metrics import start_request
+
+    with app.app_context():
+        seed(lots=20, spots=100, users=500, reservations=20000, active=0.2)
+        engines = list(db.engines.values())
+
+    user = app.test_client()
+    login(user, FIRST_USER_ID)
+    admin = app.test_client()
+    login(admin, ADMIN_ID, is_admin=True)
+
+    errors = []
+
+    # Warm the caches and time the mix unhooked first, then hook back in.
+    hooks = app.before_request_funcs[None]
+    position = hooks.index(start_request)
+    hooks.remove(start_request)
+    drive(user, admin, 1)
+    bare = drive(user, admin, args.rounds)
+    hooks.insert(position, start_request)
+
+    with count_queries(*engines) as statements:
+        instrumented = drive(user, admin, args.rounds)
+    samples = scrape(admin)
+
+    for url in USER_PAGES + ADMIN_PAGES:
+        endpoint = app.url_map.bind('localhost').match(url)[0]
+        served = samples.get(f'parkedin_requests_total{{endpoint="{endpoint}",method="GET",status="200"}}')
+        if served != args.rounds:
+            errors.append(f'{endpoint}: /metrics counted {served} requests, sent {args.rounds}')
+
+    counted = sum(value for name, value in samples.items() if name.startswith('parkedin_request_sql_statements_sum'))
+    if counted != len(statements):
+        errors.append(f'/metrics counted {counted:.0f} SQL statements, the engine ran {len(statements)}')
+
+    render = sum(value for name, value in samples.items() if name.startswith('parkedin_template_render_seconds_total'))
+    if not render:
+        errors.append('no template render time was recorded')
+
+    if 'Server-Timing' in user.get('/profile').headers:
+        errors.append('Server-Timing was sent with SERVER_TIMING off')
+    app.config['SERVER_TIMING'] = True
+    timing = user.get('/profile').headers.get('Server-Timing', '')
+    app.config['SERVER_TIMING'] = False
+    if not re.search(r'sql;dur=[\d.]+;desc="\d+ statements", render;dur=[\d.]+, total;dur=[\d.]+', timing):
+        errors.append(f'unexpected Server-Timing header: {timing!r}')
+
+    requests = args.rounds * (len(USER_PAGES) + len(ADMIN_PAGES))
+    print(f'{requests} requests: {instrumented:.2f}s instrumented, {bare:.2f}s without '
+          f'({(instrumented / bare - 1) * 100:+.1f}%)')
+    print(f'{len(statements)} SQL statements, {render:.2f}s rendering templates')
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: /metrics matches the traffic sent and the SQL run')
+
+
+if __name__ == '__main__':
+    main()
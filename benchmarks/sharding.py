@@ -0,0 +1,204 @@
+"""
+Sharding check and booking throughput benchmark.
+
+For each shard count, in its own process, seeds lots across the states of
+the synthetic dataset, spread evenly over the shards with DB_SHARD_REGIONS,
+and checks that every spot and reservation is on its lot's shard, that a
+booking and its release land there too, and that the cross-shard pages
+(history, admin totals) see every shard. Then starts writer processes that
+book and release spots through the routes, each on its own lot, and
+reports booking cycles per second, so throughput can be compared as
+shards are added. The writers only stop queueing on one write lock if they
+have CPUs to run on, so expect a gain with about one core per writer.
+
+    python benchmarks/sharding.py --shards 1,2,4 --writers 8 --seconds 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from itertools import zip_longest
+
+STATES = ('Maharashtra', 'Karnataka', 'Tamil Nadu', 'Delhi', 'Telangana', 'West Bengal', 'Gujarat')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shards', default='1,2,4')
+    parser.add_argument('--writers', type=int, default=8, help='writer processes, one lot each')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--run', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--writer', type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def check(app, errors):
+    from collections import Counter
+    from harness import login
+    from models import db, ParkingLot, ParkingSpot, Reservation, Vehicle
+    from services import SHARD_ID_SPAN, each_shard, gather, get_admin_totals, paginate, shard_count, shard_of_lot, on_shard
+
+    with app.app_context():
+        lot_shards = {lot.id: shard_of_lot(lot.id) for lot in ParkingLot.query}
+        for shard in range(shard_count()):
+            with on_shard(shard):
+                misplaced = sum(
+                    lot_shards[lot_id] != shard or not shard * SHARD_ID_SPAN < spot_id <= (shard + 1) * SHARD_ID_SPAN
+                    for spot_id, lot_id in db.session.query(ParkingSpot.id, ParkingSpot.lot_id)
+                )
+                if misplaced:
+                    errors.append(f'{misplaced} spots on shard {shard} belong to another shard')
+
+        totals = get_admin_totals()
+        reservations = gather(lambda: db.session.query(Reservation.id, Reservation.user_id, Reservation.parking_timestamp).all())
+        if totals['total_spots'] != sum(each_shard(lambda: ParkingSpot.query.count())):
+            errors.append('admin totals miss spots on some shards')
+        if totals['total_reservations'] != len(reservations):
+            errors.append(f"admin totals count {totals['total_reservations']} reservations, the shards hold {len(reservations)}")
+
+        user_id = Counter(user_id for _, user_id, _ in reservations).most_common(1)[0][0]
+        vehicle_id = Vehicle.query.filter_by(user_id=user_id).first().id
+        lot_id = max(lot_shards, key=lot_shards.get)
+
+    # Walk the user's whole history, page by page, across the shards.
+    expected = sorted(((parked_at, id) for id, owner, parked_at in reservations if owner == user_id), reverse=True)
+    seen, after = [], None
+    while True:
+        query = {'per_page': 20, **({'after': after} if after else {})}
+        with app.test_request_context('/history', query_string=query):
+            page = paginate(Reservation.query.filter_by(user_id=user_id), [Reservation.parking_timestamp, Reservation.id], descending=True)
+            seen.extend((reservation.parking_timestamp, reservation.id) for reservation in page.items)
+        after = page.next_cursor
+        if not after:
+            break
+    if seen != expected:
+        errors.append(f'history pages show {len(seen)} reservations, expected {len(expected)} in order')
+
+    client = app.test_client()
+    login(client, user_id)
+    if client.get('/history').status_code != 200 or client.get('/summary').status_code != 200:
+        errors.append('the history or summary page failed')
+
+    client.post(f'/{lot_id}/book_spot', data={'vehicle_id': vehicle_id})
+    with app.app_context(), on_shard(lot_shards[lot_id]):
+        booking = Reservation.query.filter_by(vehicle_id=vehicle_id, status='A').first()
+    if booking is None:
+        errors.append(f'a booking on lot {lot_id} is not on its shard {lot_shards[lot_id]}')
+        return
+    client.post(f'/{booking.id}/release_slot')
+    with app.app_context(), on_shard(lot_shards[lot_id]):
+        if Reservation.query.filter_by(id=booking.id, status='R').first() is None:
+            errors.append(f'the release of booking {booking.id} did not reach shard {lot_shards[lot_id]}')
+
+
+def run_writer(args):
+    """One writer process: books and releases spots of its lot until time is up."""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import logging
+    from app import create_app
+    from harness import login
+    from models import Reservation, Vehicle
+    from services import on_shard, shard_of_lot
+
+    app = create_app()
+    app.logger.setLevel(logging.CRITICAL)
+    lot_id, user_id = json.loads(os.environ['SHARDING_WRITER'])[args.writer]
+    with app.app_context():
+        vehicle_id = Vehicle.query.filter_by(user_id=user_id).first().id
+        shard = shard_of_lot(lot_id)
+
+    client = app.test_client()
+    login(client, user_id)
+    cycles = failures = 0
+    stop = time.time() + args.seconds
+    while time.time() < stop:
+        booked = client.post(f'/{lot_id}/book_spot', data={'vehicle_id': vehicle_id})
+        with app.app_context(), on_shard(shard):
+            booking = Reservation.query.filter_by(vehicle_id=vehicle_id, status='A').first()
+        released = client.post(f'/{booking.id}/release_slot') if booking else None
+        cycles += 1
+        failures += booked.status_code != 302 or released is None or released.status_code != 302
+    print(json.dumps({'cycles': cycles, 'failures': failures}))
+
+
+def run_shards(args):
+    import logging
+    from harness import bootstrap
+
+    app = bootstrap(f'shards{args.run}')
+    app.logger.setLevel(logging.CRITICAL)
+
+    from models import ParkingLot, User
+    from services import seed_synthetic, shard_of_lot
+
+    with app.app_context():
+        seed_synthetic(lots=args.writers * 4, spots=50, users=args.writers * 4, reservations=20000, active=0, seed=7)
+        users = [user.id for user in User.query.filter_by(is_admin=False).order_by(User.id)]
+        by_shard = {}
+        for lot in ParkingLot.query.order_by(ParkingLot.id):
+            by_shard.setdefault(shard_of_lot(lot.id), []).append(lot.id)
+
+    errors = []
+    check(app, errors)
+
+    # Deal the lots out round-robin over the shards, one lot per writer.
+    dealt = [lot_id for group in zip_longest(*by_shard.values()) for lot_id in group if lot_id]
+    writers = list(zip(dealt, users))[:args.writers]
+    env = dict(os.environ, SHARDING_WRITER=json.dumps(writers))
+    processes = [
+        subprocess.Popen(
+            [sys.executable, '-W', 'ignore', __file__, '--writer', str(i), '--seconds', str(args.seconds)],
+            env=env, stdout=subprocess.PIPE, text=True,
+        )
+        for i in range(args.writers)
+    ]
+    results = [json.loads(process.communicate()[0].splitlines()[-1]) for process in processes]
+
+    print(json.dumps({
+        'shards_used': len(by_shard),
+        'cycles_per_second': sum(result['cycles'] for result in results) / args.seconds,
+        'failures': sum(result['failures'] for result in results),
+        'errors': errors,
+    }))
+
+
+def main():
+    args = parse_args()
+    if args.writer is not None:
+        return run_writer(args)
+    if args.run:
+        return run_shards(args)
+
+    print(f'{args.writers} writer processes, {args.seconds:.0f}s, {os.cpu_count()} CPUs')
+    print(f"{'shards':>6} {'in use':>7} {'cycles/s':>9} {'failed':>7}")
+    errors = []
+    baseline = None
+    for shards in map(int, args.shards.split(',')):
+        regions = ','.join(f'{state}={n % shards}' for n, state in enumerate(STATES))
+        output = subprocess.run(
+            [sys.executable, '-W', 'ignore', __file__, '--run', str(shards), '--writers', str(args.writers),
+             '--seconds', str(args.seconds)],
+            env=dict(os.environ, DB_SHARDS=str(shards), DB_SHARD_REGIONS=regions),
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        baseline = baseline or result['cycles_per_second']
+        print(f"{shards:>6} {result['shards_used']:>7} {result['cycles_per_second']:>9.1f} {result['failures']:>7}"
+              f"   x{result['cycles_per_second'] / baseline:.2f}")
+        errors.extend(f'{shards} shards: {error}' for error in result['errors'])
+        if result['failures']:
+            errors.append(f"{shards} shards: {result['failures']} failed booking cycles")
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: rows stay on their lot\'s shard and cross-shard pages see them all')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Lot provisioning and resizing benchmark.
+
+Creates lots of 10k and 100k spots through the admin routes, grows them by
+half and shrinks them back to a quarter, timing each request and counting
+its SQL statements. Then checks every lot ended up with exactly max_spots
+spots numbered 1..max_spots, and that shrinking a lot with past
+reservations leaves the daily rollup equal to a fresh backfill. With
+--legacy it also times the old one-ORM-object-per-spot code path on the
+same sizes for comparison.
+
+    python benchmarks/spot_provisioning.py --sizes 10000 100000
+"""
+import argparse
+import sys
+import time
+
+from harness import bootstrap, seed, login, count_queries, ADMIN_ID, FIRST_USER_ID
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='spots per lot')
+    parser.add_argument('--legacy', action='store_true', help='also time the per-spot ORM loop')
+    return parser.parse_args()
+
+
+def lot_form(name, max_spots):
+    return {
+        'locName': name, 'address': f'{name} Road', 'city': 'Bench', 'pincode': '400001',
+        'state': 'Bench', 'price': '20', 'maxSpots': str(max_spots),
+    }
+
+
+def legacy_provision(max_spots):
+    """The per-spot loops the admin routes used before, kept here for comparison."""
+    from models import db, Address, ParkingLot, ParkingSpot
+
+    address = Address(address='Legacy Road', city='Bench', pincode='400001', state='Bench')
+    db.session.add(address)
+    db.session.commit()
+    lot = ParkingLot(prime_location_name='Legacy', address_id=address.id, price_per_hour=20, max_spots=max_spots)
+    db.session.add(lot)
+    db.session.commit()
+    for i in range(1, max_spots + 1):
+        db.session.add(ParkingSpot(spot_number=f"LOT{lot.id}-S{i:03d}", lot_id=lot.id, status='A'))
+    db.session.commit()
+    return lot.id
+
+
+def legacy_shrink(lot_id, old_max_spots, max_spots):
+    from models import db, ParkingLot, ParkingSpot
+
+    for i in range(old_max_spots, max_spots, -1):
+        spot = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=f"LOT{lot_id}-S{i:03d}", status='A').first()
+        if spot:
+            db.session.delete(spot)
+    ParkingLot.query.get(lot_id).max_spots = max_spots
+    db.session.commit()
+
+
+def rollup_snapshot():
+    from models import DailyLotStats
+    from services.sharding import each_shard
+
+    def shard_rows():
+        return [
+            ((row.lot_id, row.day), (row.reservation_count, round(row.revenue, 2), round(row.occupied_hours, 3)))
+            for row in DailyLotStats.query
+        ]
+    return dict(row for rows in each_shard(shard_rows) for row in rows)
+
+
+def check_rollup(app, admin, errors):
+    """
+    Books and releases a few spots of a seeded lot on top of a backfilled
+    rollup, shrinks the lot below them, and compares the rollup kept up by
+    the routes with one rebuilt from the reservations that are left.
+    """
+    from models import Reservation
+    from services import backfill_daily_stats
+
+    with app.app_context():
+        seed(lots=1, spots=20, users=5, reservations=400, active=0)
+        backfill_daily_stats()
+
+    for i in range(5):
+        client = app.test_client()
+        login(client, FIRST_USER_ID + i)
+        if client.post('/1/book_spot', data={'vehicle_id': FIRST_USER_ID + i}).status_code != 302:
+            sys.exit(f'booking {i} on lot 1 failed')
+    with app.app_context():
+        bookings = [(r.id, r.user_id) for r in Reservation.query.filter_by(status='A')]
+    for booking_id, user_id in bookings:
+        client = app.test_client()
+        login(client, user_id)
+        if client.post(f'/{booking_id}/release_slot').status_code != 302:
+            sys.exit(f'releasing reservation {booking_id} failed')
+
+    if admin.post('/admin/editLot/1', data=lot_form('Lot 0', 3)).status_code != 302:
+        sys.exit('shrinking lot 1 failed')
+
+    with app.app_context():
+        maintained = rollup_snapshot()
+        backfill_daily_stats()
+        rebuilt = rollup_snapshot()
+    if maintained != rebuilt:
+        differing = sorted(key for key in maintained.keys() | rebuilt.keys() if maintained.get(key) != rebuilt.get(key))
+        errors.append(f'after a shrink the rollup differs from a backfill on {len(differing)} days, e.g. '
+                      f'{differing[0]}: {maintained.get(differing[0])} vs {rebuilt.get(differing[0])}')
+
+
+def main():
+    args = parse_args()
+    app = bootstrap('provisioning')
+
+    from models import db, ParkingLot, ParkingSpot
+    from services.provisioning import spot_index
+
+    client = app.test_client()
+    login(client, ADMIN_ID, is_admin=True)
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def timed(method, url, data):
+        with count_queries(*engines) as statements:
+            started = time.perf_counter()
+            response = method(url, data=data)
+            elapsed = time.perf_counter() - started
+        if response.status_code != 302:
+            sys.exit(f'{url} returned {response.status_code}')
+        return elapsed, len(statements)
+
+    errors = []
+    check_rollup(app, client, errors)
+
+    print(f"{'spots':>8}  {'step':<18}{'seconds':>9}{'statements':>12}")
+    for size in args.sizes:
+        name = f'Bench {size}'
+        elapsed, statements = timed(client.post, '/admin/addLot', lot_form(name, size))
+        print(f'{size:>8}  {"create":<18}{elapsed:>9.3f}{statements:>12}')
+
+        with app.app_context():
+            lot_id = ParkingLot.query.filter_by(prime_location_name=name).one().id
+
+        for step, target in (('grow to 150%', size * 3 // 2), ('shrink to 25%', size // 4)):
+            elapsed, statements = timed(client.post, f'/admin/editLot/{lot_id}', lot_form(name, target))
+            print(f'{size:>8}  {step:<18}{elapsed:>9.3f}{statements:>12}')
+
+        if args.legacy:
+            with app.app_context():
+                started = time.perf_counter()
+                legacy_id = legacy_provision(size)
+                print(f'{size:>8}  {"legacy create":<18}{time.perf_counter() - started:>9.3f}')
+                started = time.perf_counter()
+                legacy_shrink(legacy_id, size, size // 4)
+                print(f'{size:>8}  {"legacy shrink":<18}{time.perf_counter() - started:>9.3f}')
+
+    with app.app_context():
+        for lot in ParkingLot.query.filter(ParkingLot.prime_location_name.like('Bench %')):
+            numbers = sorted(db.session.scalars(db.select(spot_index).where(ParkingSpot.lot_id == lot.id)))
+            if numbers != list(range(1, lot.max_spots + 1)):
+                errors.append(f'lot {lot.id}: {len(numbers)} spots for max_spots={lot.max_spots}')
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: every lot has exactly its max_spots spots, and a shrink keeps the rollup equal to a backfill')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+SQLite profile concurrency benchmark.
+
+For each DB_PROFILE, in its own process, runs reader threads over the user
+pages for a while on their own, then again while writer threads book and
+release spots through the routes. Reports read throughput and p95 in both
+phases, write throughput and failed requests ("database is locked" shows
+up as 500s), so the profiles can be compared side by side.
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+READ_URLS = ['/', '/history', '/profile', '/1/view_slot', '/summary']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', default='default,production')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5, help='length of each phase')
+    parser.add_argument('--profile', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def read_loop(app, user_id, stop, samples):
+    from harness import login
+
+    client = app.test_client()
+    login(client, user_id)
+    n = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        status = client.get(READ_URLS[n % len(READ_URLS)]).status_code
+        samples.append((time.perf_counter() - started, status != 200))
+        n += 1
+
+
+def write_loop(app, user_id, stop, samples):
+    from harness import login
+    from models import Reservation
+
+    client = app.test_client()
+    login(client, user_id)
+    while not stop.is_set():
+        started = time.perf_counter()
+        booked = client.post('/1/book_spot', data={'vehicle_id': user_id})
+        with app.app_context():
+            booking = Reservation.query.filter_by(vehicle_id=user_id, status='A').first()
+        released = client.post(f'/{booking.id}/release_slot') if booking else None
+        failed = booked.status_code != 302 or released is None or released.status_code != 302
+        samples.append((time.perf_counter() - started, failed))
+
+
+def phase(app, args, writers):
+    from harness import FIRST_USER_ID
+
+    stop = threading.Event()
+    reads, writes = [], []
+    threads = [
+        threading.Thread(target=read_loop, args=(app, FIRST_USER_ID + i, stop, reads))
+        for i in range(args.readers)
+    ] + [
+        threading.Thread(target=write_loop, args=(app, FIRST_USER_ID + args.readers + i, stop, writes))
+        for i in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(latency for latency, _ in reads)
+    return {
+        'reads_per_second': len(reads) / args.seconds,
+        'read_p95_ms': statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0,
+        'read_errors': sum(failed for _, failed in reads),
+        'cycles_per_second': len(writes) / args.seconds,
+        'write_errors': sum(failed for _, failed in writes),
+    }
+
+
+def run_profile(args):
+    import logging
+    from harness import bootstrap, seed, login, FIRST_USER_ID
+
+    app = bootstrap(f'sqlite-{args.profile}')
+    app.logger.setLevel(logging.CRITICAL)
+    with app.app_context():
+        seed(lots=10, spots=100, users=args.readers + args.writers, reservations=50000, active=0)
+
+    # Warm the caches, so the first phase is not measuring cold starts.
+    client = app.test_client()
+    for i in range(args.readers):
+        login(client, FIRST_USER_ID + i)
+        for url in READ_URLS:
+            client.get(url)
+
+    print(json.dumps({
+        'reads only': phase(app, args, 0),
+        'reads + writes': phase(app, args, args.writers),
+    }))
+
+
+def main():
+    args = parse_args()
+    if args.profile:
+        return run_profile(args)
+
+    print(f'{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s per phase')
+    print(f"{'profile':<12} {'phase':<16} {'reads/s':>8} {'read p95':>9} {'errors':>7} {'cycles/s':>9} {'errors':>7}")
+    for profile in args.profiles.split(','):
+        output = subprocess.run(
+            [sys.executable, '-W', 'ignore', __file__, '--profile', profile, '--readers', str(args.readers),
+             '--writers', str(args.writers), '--seconds', str(args.seconds)],
+            env=dict(os.environ, DB_PROFILE=profile), capture_output=True, text=True, check=True,
+        ).stdout
+        for label, result in json.loads(output.splitlines()[-1]).items():
+            print(f"{profile:<12} {label:<16} {result['reads_per_second']:>8.1f} {result['read_p95_ms']:>7.1f}ms "
+                  f"{result['read_errors']:>7} {result['cycles_per_second']:>9.1f} {result['write_errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Cold start benchmark.
+
+Starts fresh interpreters that import the app module, call create_app()
+and serve a first request, timing each step. Checks that building the app
+runs no SQL and does not even create the database file, so pre-forked
+workers boot without touching the database, and fails if the median time
+to a ready app exceeds the budget.
+
+    python benchmarks/startup_time.py --runs 10 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import json, os, sys, time
+started = time.perf_counter()
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+sys.path.insert(0, sys.argv[1])
+import app
+imported = time.perf_counter()
+
+application = app.create_app()
+created = time.perf_counter()
+database_created = os.path.exists(sys.argv[2])
+setup_statements = len(statements)
+
+application.test_client().get('/auth/login')
+served = time.perf_counter()
+
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': served - created,
+    'statements': setup_statements,
+    'database_created': database_created,
+}))
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=1500, help='median import + create_app limit')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    database = os.path.join(tempfile.mkdtemp(prefix='parkedin-startup-'), 'startup.sqlite3')
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=f'sqlite:///{database}', SECRET_KEY='startup')
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-c', CHILD, ROOT, database],
+            env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+
+    errors = []
+    for step in ('import', 'create_app', 'first_request'):
+        times = [run[step] * 1000 for run in runs]
+        print(f'{step:<14} median {statistics.median(times):7.1f} ms   max {max(times):7.1f} ms')
+
+    ready = statistics.median((run['import'] + run['create_app']) * 1000 for run in runs)
+    print(f'{"ready":<14} median {ready:7.1f} ms   budget {args.budget_ms:.0f} ms')
+
+    if any(run['statements'] for run in runs):
+        errors.append(f"create_app ran {max(run['statements'] for run in runs)} SQL statements")
+    if any(run['database_created'] for run in runs):
+        errors.append('create_app created the database file')
+    if ready > args.budget_ms:
+        errors.append(f'median start {ready:.0f} ms is over the {args.budget_ms:.0f} ms budget')
+
+    if errors:
+        print('FAILED')
+        for error in errors:
+            print(f'  {error}')
+        sys.exit(1)
+
+    print('OK: the app builds without touching the database, within budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import click
+from flask.cli import with_appcontext
+
+
+# --------------------------
+# Database Setup
+# --------------------------
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create missing tables and indexes and the admin account."""
+    from models import init_db
+
+    init_db()
+    click.echo('Initialized the database.')
+
+
+# --------------------------
+# Rollup Backfill
+# --------------------------
+@click.command('backfill-daily-stats')
+@with_appcontext
+def backfill_daily_stats_command():
+    """Rebuild the DailyLotStats rollup from the reservation table."""
+    from services import backfill_daily_stats
+
+    rows = backfill_daily_stats()
+    click.echo(f'Rebuilt {rows} daily lot stats rows.')
+
+
+# --------------------------
+# Search Index Rebuild
+# --------------------------
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Repopulate the FTS5 search indexes from the base tables."""
+    from services import rebuild_search_index
+
+    rebuild_search_index()
+    click.echo('Rebuilt search indexes.')
+
+
+# --------------------------
+# Synthetic Data
+# --------------------------
+@click.command('seed-synthetic')
+@click.option('--lots', default=50, show_default=True, help='Parking lots to add.')
+@click.option('--spots', default=200, show_default=True, help='Spots per lot.')
+@click.option('--users', default=5000, show_default=True, help='Users to add, each with 1-3 vehicles.')
+@click.option('--reservations', default=500000, show_default=True, help='Released reservations to add.')
+@click.option('--active', default=0.2, show_default=True, help='Share of the new users parked right now.')
+@click.option('--days', default=365, show_default=True, help='How far back the reservations go.')
+@click.option('--seed', type=int, help='Random seed, for a repeatable dataset.')
+@click.option('--password', default='password', show_default=True, help='Password every new user logs in with.')
+@with_appcontext
+def seed_synthetic_command(lots, spots, users, reservations, active, days, seed, password):
+    """Add a realistic, large synthetic dataset for load testing."""
+    from services import seed_synthetic
+
+    added = seed_synthetic(lots, spots, users, reservations, active=active, days=days, seed=seed, password=password)
+    click.echo('Added ' + ', '.join(f'{count} {table}' for table, count in added.items()) + '.')
+
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(backfill_daily_stats_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(seed_synthetic_command)
@@ -1,9 +1,41 @@
 from dotenv import load_dotenv
-from app import app
 import os
 
 load_dotenv()
 
-app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS')
\ No newline at end of file
+
+class Config:
+    SECRET_KEY = os.getenv("SECRET_KEY")
+    SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
+    SQLALCHEMY_TRACK_MODIFICATIONS = os.getenv('SQLALCHEMY_TRACK_MODIFICATIONS')
+    DB_PROFILE = os.getenv('DB_PROFILE', 'production')
+    DB_BUSY_TIMEOUT = int(os.getenv('DB_BUSY_TIMEOUT', 5000))
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 16))
+    DB_POOL_OVERFLOW = int(os.getenv('DB_POOL_OVERFLOW', 16))
+    DB_READ_ROUTING = os.getenv('DB_READ_ROUTING', '1') == '1'
+    DB_REPLICA_URI = os.getenv('DB_REPLICA_URI')
+    DB_READ_YOUR_WRITES = float(os.getenv('DB_READ_YOUR_WRITES', 5))
+    DB_SHARDS = int(os.getenv('DB_SHARDS', 1))
+    DB_SHARD_REGIONS = os.getenv('DB_SHARD_REGIONS')
+    PAGE_SIZE = int(os.getenv('PAGE_SIZE', 20))
+    OCCUPANCY_TTL = float(os.getenv('OCCUPANCY_TTL', 1))
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', 32))
+    LOT_CACHE_SIZE = int(os.getenv('LOT_CACHE_SIZE', 256))
+    LOT_CACHE_TTL = int(os.getenv('LOT_CACHE_TTL', 60))
+    FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', 2048))
+    FRAGMENT_CACHE_TTL = int(os.getenv('FRAGMENT_CACHE_TTL', 600))
+    ETAG_VERSION = os.getenv('ETAG_VERSION')
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 0))
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')
+    PROFILE_SAMPLE_RATE = int(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 1))
+    PROFILE_DIR = os.getenv('PROFILE_DIR')
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_NICE = int(os.getenv('PASSWORD_HASH_NICE', 10))
+    AUTH_IP_LIMIT = os.getenv('AUTH_IP_LIMIT', '30/60')
+    AUTH_EMAIL_LIMIT = os.getenv('AUTH_EMAIL_LIMIT', '5/300')
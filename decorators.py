@@ -1,6 +1,8 @@
-from flask import redirect, session, flash, url_for
+from flask import redirect, session, flash, url_for, request, make_response, current_app, g
 from functools import wraps
-from models import User
+from werkzeug.http import is_resource_modified
+from models import db, User
+from services import recently_wrote, shard_of_lot, shard_of_row, throttle_ip, HashingBusy
 
 
 def auth_required(func):
@@ -24,4 +26,99 @@ def admin_required(func):
             flash('You are not authorized to visit this page.')
             return redirect(url_for('admin.index'))
         return func(*args, **kwargs)
-    return inner
\ No newline at end of file
+    return inner
+
+
+def conditional(validator):
+    """
+    Serves the page with the ETag / Last-Modified `validator(**view_args)`
+    returns, and answers a request that already holds them with 304 Not
+    Modified without running the view. Pages with pending flash messages
+    are always rendered, since the messages are not part of the validator.
+    """
+    def decorator(func):
+        @wraps(func)
+        def inner(*args, **kwargs):
+            if '_flashes' in session:
+                return func(*args, **kwargs)
+
+            validators = validator(*args, **kwargs)
+            if validators is None:
+                return func(*args, **kwargs)
+            etag, last_modified = validators
+
+            if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            else:
+                response = current_app.response_class(status=304)
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return inner
+    return decorator
+
+
+def read_replica(func):
+    """
+    Runs the view's queries on the read-only replica engine, unless this
+    client wrote something moments ago and must see it (read-your-writes).
+    """
+    @wraps(func)
+    def inner(*args, **kwargs):
+        g.db_read_only = not recently_wrote()
+        return func(*args, **kwargs)
+    return inner
+
+
+def sharded(func):
+    """
+    Runs the view on the shard holding the lot (lot_id), spot (spot_id) or
+    reservation (booking_id) its URL names, so its spot and reservation
+    queries and writes go there.
+    """
+    @wraps(func)
+    def inner(*args, **kwargs):
+        if 'lot_id' in kwargs:
+            g.db_shard = shard_of_lot(kwargs['lot_id'])
+        else:
+            g.db_shard = shard_of_row(kwargs.get('spot_id') or kwargs.get('booking_id'))
+        return func(*args, **kwargs)
+    return inner
+
+
+def throttled(page):
+    """
+    Guards a view that hashes passwords. Once the client's IP has used up
+    AUTH_IP_LIMIT, or when the hashing queue is full, the view does not
+    run: `page` (an endpoint) is shown instead with the reason flashed,
+    as 429 Too Many Requests or 503 Service Unavailable and a Retry-After.
+    """
+    def decorator(func):
+        @wraps(func)
+        def inner(*args, **kwargs):
+            wait = throttle_ip(request.remote_addr)
+            if wait:
+                return retry_later(page, wait, 429)
+            try:
+                return func(*args, **kwargs)
+            except HashingBusy:
+                db.session.rollback()
+                return retry_later(page, 1, 503)
+        return inner
+    return decorator
+
+
+def retry_later(page, wait, status):
+    if status == 429:
+        flash(f'Too many attempts. Please try again in {wait} seconds.', 'danger')
+    else:
+        flash('The server is busy. Please try again in a moment.', 'danger')
+    response = make_response(current_app.view_functions[page]())
+    response.status_code = status
+    response.headers['Retry-After'] = str(wait)
+    return response
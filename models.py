@@ -1,9 +1,57 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
 from datetime import datetime
-from app import app
 from werkzeug.security import generate_password_hash
 
-db = SQLAlchemy(app)
+
+# Bind key of the read-only engine, present when read routing is on.
+REPLICA = 'replica'
+
+# Tables whose rows live on the shard of their lot when DB_SHARDS > 1. The
+# other tables form the catalog, which stays in the primary database.
+SHARDED_TABLES = frozenset({'parking_spot', 'reservation', 'daily_lot_stats'})
+
+
+def shard_bind(shard):
+    """Bind key of a shard's engine; shard 0 is the primary database."""
+    return f'shard{shard}' if shard else None
+
+
+class RoutingSession(Session):
+    """
+    Sends queries to the shard in g.db_shard, or to the replica engine in
+    views marked @read_replica. A shard sees the catalog through a read-only
+    attachment, so flushes and INSERT/UPDATE/DELETE statements only go to it
+    for sharded tables; every other write goes to the primary, as does
+    anything bound to another bind key.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_app_context():
+            return engine
+
+        engines = self._db.engines
+        if engine is not engines.get(None):
+            return engine
+
+        writing = self._flushing or isinstance(clause, UpdateBase)
+        shard = g.get('db_shard')
+        if shard:
+            if not writing or _table(mapper, clause).name in SHARDED_TABLES:
+                return engines[shard_bind(shard)]
+        elif not writing and g.get('db_read_only') and REPLICA in engines:
+            return engines[REPLICA]
+        return engine
+
+
+def _table(mapper, clause):
+    return clause.table if isinstance(clause, UpdateBase) else mapper.local_table
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # --------------------------
 # USER TABLE
@@ -24,6 +72,10 @@ class User(db.Model):
     vehicles = db.relationship('Vehicle', backref='owner', lazy=True, cascade='all, delete-orphan')
     reservations = db.relationship('Reservation', backref='user', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_user_registered_at', 'registered_at'),
+    )
+
 
 #---------------------------
 # ADDRESS TABLE
@@ -52,6 +104,10 @@ class Vehicle(db.Model):
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_vehicle_user_parked', 'user_id', 'is_parked_in'),
+    )
+
 
 # --------------------------
 # PARKING LOT TABLE
@@ -85,6 +141,12 @@ class ParkingSpot(db.Model):
 
     reservations = db.relationship('Reservation', backref='spot', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_parking_spot_lot_status', 'lot_id', 'status'),
+        db.Index('ix_parking_spot_spot_number', 'spot_number'),
+        {'sqlite_autoincrement': True},  # ids stay inside their shard's range
+    )
+
 
 # --------------------------
 # RESERVATION TABLE
@@ -102,9 +164,60 @@ class Reservation(db.Model):
 
     vehicle = db.relationship('Vehicle', backref='reservations', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_reservation_user_parked_at', 'user_id', 'parking_timestamp'),
+        db.Index('ix_reservation_status', 'status'),
+        db.Index('ix_reservation_parked_at', 'parking_timestamp'),
+        db.Index('ix_reservation_spot_status', 'spot_id', 'status'),
+        db.Index('ix_reservation_vehicle_status', 'vehicle_id', 'status'),
+        {'sqlite_autoincrement': True},  # ids stay inside their shard's range
+    )
+
+
+# --------------------------
+# LOT SHARD TABLE
+# --------------------------
+class LotShard(db.Model):
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), primary_key=True)
+    shard = db.Column(db.Integer, nullable=False)  # lots without a row are on shard 0
+
+    lot = db.relationship('ParkingLot', backref=db.backref('shard_assignment', uselist=False, cascade='all, delete-orphan'))
+
+
+# --------------------------
+# DAILY LOT STATS TABLE
+# --------------------------
+class DailyLotStats(db.Model):
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # UTC day the reservations started on
+
+    reservation_count = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+    occupied_hours = db.Column(db.Float, default=0, nullable=False)
+    peak_occupancy = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_daily_lot_stats_day', 'day'),
+    )
 
-with app.app_context():
+
+# --------------------------
+# Schema and Seed Data
+# --------------------------
+def init_db():
+    """
+    Creates whatever tables, indexes and search indexes are missing, in the
+    primary database and in every shard, the admin account on first run,
+    and backfills the daily stats rollup after an upgrade. Safe to run
+    again. Needs an app context.
+    """
     db.create_all()
+
+    # create_all() skips the indexes of tables that already exist.
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
     # If admin already exists
     admin = User.query.filter_by(is_admin=True).first()
 
@@ -117,4 +230,13 @@ with app.app_context():
 
         admin = User(email='admin@gmail.com', password=password_hash, full_name='Admin', is_admin=True, address_id=admin_address.id)
         db.session.add(admin)
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+
+    from services.sharding import create_shards
+    create_shards()
+
+    from services.rollup import backfill_if_empty
+    backfill_if_empty()
+
+    from services.search import create_search_index
+    create_search_index()
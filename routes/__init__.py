@@ -1,10 +1,14 @@
 from .auth_routes import auth_bp
 from .admin_routes import admin_bp
 from .user_routes import user_bp
+from .event_routes import events_bp
+from .metrics_routes import metrics_bp
 
 
 
 def register_blueprints(app):
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(admin_bp, url_prefix='/admin')
-    app.register_blueprint(user_bp)
\ No newline at end of file
+    app.register_blueprint(user_bp)
+    app.register_blueprint(events_bp, url_prefix='/events')
+    app.register_blueprint(metrics_bp)
\ No newline at end of file
@@ -1,8 +1,35 @@
-from flask import Blueprint, request, render_template, redirect, flash, url_for, session
-from models import db, User, Address, Vehicle, ParkingLot, ParkingSpot, Reservation
-from decorators import admin_required
-from datetime import datetime, timedelta
-from sqlalchemy import func, or_
+from flask import Blueprint, request, render_template, redirect, flash, url_for, session, jsonify
+from models import db, User, Address, ParkingLot, ParkingSpot, Reservation
+from decorators import admin_required, conditional, read_replica, sharded
+from services import (
+    get_lot_occupancy,
+    refresh_lot_grid,
+    drop_lot_grid,
+    lot_page,
+    lot_cache,
+    fragment_cache,
+    invalidate_lots,
+    user_search,
+    paginate,
+    search_users,
+    matching_lot_ids,
+    matching_user_ids,
+    matching_vehicle_ids,
+    get_admin_totals,
+    get_daily_lot_stats,
+    parse_window,
+    SUMMARY_WINDOWS,
+    provision_lot,
+    resize_lot,
+    lot_validator,
+    assign_shard,
+    forget_lot_shard,
+    on_shard,
+    gather,
+)
+from datetime import datetime
+from sqlalchemy import or_, select
+from sqlalchemy.orm import joinedload, selectinload
 
 
 admin_bp = Blueprint('admin', __name__)
@@ -13,31 +40,22 @@ admin_bp = Blueprint('admin', __name__)
 # --------------------------
 @admin_bp.route('/', methods=['GET'])
 @admin_required
+@read_replica
 def index():
     user_logged_in = 'user_id' in session
     query = request.args.get('query', '').strip()
 
-    if query:
-        search = f'%{query}%'
-        parking_lots = (
-                        ParkingLot.query
-                        .join(ParkingLot.address)
-                        .filter(
-                            or_(
-                                ParkingLot.prime_location_name.ilike(search),
-                                Address.address.ilike(search),
-                                Address.city.ilike(search),
-                                Address.state.ilike(search),
-                                Address.pincode.ilike(search),
-                            )
-                        ).all()
-        )
-    else:
-        parking_lots = ParkingLot.query.all()
+    page = lot_page(query)
+    parking_lots = page.items
+
+    occupancy = get_lot_occupancy([lot.id for lot in parking_lots])
+
     return render_template(
                             'admin/index.html', 
                             user_logged_in=user_logged_in, 
                             parking_lots=parking_lots,
+                            page=page,
+                            occupancy=occupancy,
                             query=query
                           )
 
@@ -49,12 +67,7 @@ def index():
 @admin_required
 def add_parking_lot():
     user_logged_in = 'user_id' in session
-    parking_lots = ParkingLot.query.all()
-    return render_template(
-                            'admin/add_parking_lot.html', 
-                            user_logged_in=user_logged_in, 
-                            parking_lots=parking_lots
-                          )
+    return render_template('admin/add_parking_lot.html', user_logged_in=user_logged_in)
 
 @admin_bp.route('/addLot', methods=['POST'])
 @admin_required
@@ -85,29 +98,19 @@ def add_parking_lot_post():
                       state=state
     )
 
-    db.session.add(new_address)
-    db.session.commit()
-    
     new_parking_lot = ParkingLot(
                              prime_location_name = locName,
-                             address_id = new_address.id,
+                             address = new_address,
                              price_per_hour = price,
                              max_spots = maxSpots
                             )
     
     db.session.add(new_parking_lot)
-    db.session.commit()
-
-    for i in range(1, int(maxSpots) + 1):
-        spot_number = f"LOT{new_parking_lot.id}-S{i:03d}"
-        new_spot = ParkingSpot(
-            spot_number=spot_number,
-            lot_id=new_parking_lot.id,
-            status='A'
-        )
-        db.session.add(new_spot)
-
-    db.session.commit()
+    with on_shard(assign_shard(new_parking_lot)):
+        provision_lot(new_parking_lot)
+        db.session.commit()
+    invalidate_lots()
+    refresh_lot_grid(new_parking_lot.id)
 
     flash('Parking lot created successfully.', 'success')
     return redirect(url_for('admin.index'))
@@ -120,11 +123,12 @@ def add_parking_lot_post():
 @admin_required
 def edit_parking_lot(lot_id):
     user_logged_in = 'user_id' in session
-    parking_lot = ParkingLot.query.get(lot_id)
+    parking_lot = ParkingLot.query.options(joinedload(ParkingLot.address)).get(lot_id)
     return render_template('admin/edit_parking_lot.html', user_logged_in=user_logged_in, parking_lot=parking_lot)
 
 @admin_bp.route('/editLot/<int:lot_id>', methods=['POST'])
 @admin_required
+@sharded
 def editParkingLot_post(lot_id):
     new_locName = request.form.get('locName')
     new_address = request.form.get('address')
@@ -146,7 +150,6 @@ def editParkingLot_post(lot_id):
         return redirect(url_for('admin.edit_parking_lot', lot_id=lot_id))
 
     existing_pl = ParkingLot.query.get(lot_id)
-    old_maxSpots = existing_pl.max_spots
 
     if not existing_pl:
         flash('Parking Lot does not exist.', 'danger')
@@ -159,35 +162,20 @@ def editParkingLot_post(lot_id):
         return redirect(url_for('admin.edit_parking_lot', lot_id=lot_id))
     
     existing_pl.prime_location_name =new_locName
-    existing_pl.price_per_hour = new_price
-    existing_pl.max_spots = new_maxSpots
+    existing_pl.price_per_hour = price
     existing_pl.updated_at = datetime.utcnow()
     existing_pl.address.address = new_address
     existing_pl.address.city = new_city
     existing_pl.address.pincode = new_pincode
     existing_pl.address.state = new_state
 
-    if maxSpots > old_maxSpots:
-        for i in range(old_maxSpots + 1, maxSpots + 1):
-            spot_number = f"LOT{lot_id}-S{i:03d}"
-            new_spot = ParkingSpot(
-                spot_number=spot_number,
-                lot_id=lot_id,
-                status='A'
-            )
-            db.session.add(new_spot)
-    
-    if maxSpots < old_maxSpots:
-        for i in range(old_maxSpots, maxSpots, -1):
-            spot_number = f"LOT{lot_id}-S{i:03d}"
-            spot_to_delete = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number, status='A').first()
-            if spot_to_delete:
-                db.session.delete(spot_to_delete)
-            else:
-                flash(f"Could not delete spot {spot_number} because it's occupied.", 'danger')
-
+    kept = resize_lot(existing_pl, maxSpots)
+    if kept:
+        flash(f"Could not delete spots {', '.join(kept)} because they're occupied.", 'danger')
 
     db.session.commit()
+    invalidate_lots()
+    refresh_lot_grid(lot_id)
 
     flash('Parking Lot updated successfully.', 'success')
     return redirect(url_for('admin.index'))
@@ -198,6 +186,7 @@ def editParkingLot_post(lot_id):
 # --------------------------
 @admin_bp.route('/deleteLot/<int:lot_id>', methods=['POST'])
 @admin_required
+@sharded
 def deleteParkingLot(lot_id):
     parking_lot = ParkingLot.query.get(lot_id)
 
@@ -211,6 +200,9 @@ def deleteParkingLot(lot_id):
 
     db.session.delete(parking_lot)
     db.session.commit()
+    invalidate_lots()
+    drop_lot_grid(lot_id)
+    forget_lot_shard(lot_id)
 
     flash("Parking lot deleted successfully.", 'success')
     return redirect(url_for('admin.index'))
@@ -221,12 +213,30 @@ def deleteParkingLot(lot_id):
 # --------------------------
 @admin_bp.route('/view_lot/<int:lot_id>', methods=['GET'])
 @admin_required
+@conditional(lot_validator)
 def view_lot(lot_id):
     user_logged_in = 'user_id' in session
-    lot = ParkingLot.query.get(lot_id)
+    lot = ParkingLot.query.options(joinedload(ParkingLot.address)).get(lot_id)
+    return render_template('admin/view_lot.html', user_logged_in=user_logged_in, lot=lot)
+
+
+@admin_bp.route('/spot/<int:spot_id>/details', methods=['GET'])
+@admin_required
+@sharded
+def spot_details(spot_id):
+    spot = ParkingSpot.query.options(joinedload(ParkingSpot.lot)).get(spot_id)
+    if not spot:
+        return 'Spot does not exist.', 404
+
+    reservation = (
+        Reservation.query
+        .filter_by(spot_id=spot_id, status='A')
+        .options(joinedload(Reservation.user), joinedload(Reservation.vehicle))
+        .first()
+    )
     current_time = datetime.utcnow()
 
-    return render_template('admin/view_lot.html', user_logged_in=user_logged_in, lot=lot, current_time=current_time)
+    return render_template('admin/spot_details.html', spot=spot, reservation=reservation, current_time=current_time)
 
 
 # --------------------------
@@ -234,27 +244,20 @@ def view_lot(lot_id):
 # --------------------------
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
+@read_replica
 def all_users():
     user_logged_in = 'user_id' in session
     query = request.args.get('query', '').strip()
 
+    users = User.query.options(joinedload(User.address), selectinload(User.vehicles))
+
     if query:
-        search = f'%{query}%'
-        users = (
-                 User.query
-                 .filter(
-                     or_(
-                         User.full_name.ilike(search),
-                         User.email.ilike(search),
-                     )
-                 )
-                 .order_by(User.registered_at.desc())
-                 .all()
-        )
+        page = paginate(search_users(users, query), [user_search.c.rank, User.id])
     else:
-        users = User.query.order_by(User.registered_at.desc()).all()
+        page = paginate(users, [User.registered_at, User.id], descending=True)
+    users = page.items
 
-    return render_template('admin/all_users.html', user_logged_in=user_logged_in, users=users)
+    return render_template('admin/all_users.html', user_logged_in=user_logged_in, users=users, page=page, query=query)
 
 
 # --------------------------
@@ -271,7 +274,7 @@ def delete_user(user_id):
         flash('Invalid User ID! Cannot delete user.', 'danger')
         return redirect(url_for('admin.all_users'))
 
-    if user.reservations:
+    if gather(lambda: Reservation.query.filter_by(user_id=user_id).limit(1).all()):
         flash('User having active parking! Cannot delete user.', 'danger')
         return redirect(url_for('admin.all_users'))
     
@@ -287,34 +290,36 @@ def delete_user(user_id):
 # --------------------------
 @admin_bp.route('/reservations', methods=['GET'])
 @admin_required
+@read_replica
 def all_reservations():
     user_logged_in = 'user_id' in session
     current_time = datetime.utcnow()
     query = request.args.get('query', '')
 
     if query:
-        search = f'%{query}%'
+        matching_spot_ids = select(ParkingSpot.id).where(ParkingSpot.lot_id.in_(matching_lot_ids(query)))
         reservations = (
                         Reservation.query
-                        .join(User, Reservation.user)
-                        .join(ParkingSpot, Reservation.spot)
-                        .join(ParkingLot, ParkingSpot.lot)
-                        .join(Vehicle, Reservation.vehicle)
                         .filter(
                             or_(
-                                User.full_name.ilike(search),
-                                ParkingLot.prime_location_name.ilike(search),
-                                Vehicle.vehicle_number.ilike(search),
-                                Vehicle.vehicle_type.ilike(search)
+                                Reservation.user_id.in_(matching_user_ids(query)),
+                                Reservation.spot_id.in_(matching_spot_ids),
+                                Reservation.vehicle_id.in_(matching_vehicle_ids(query)),
                             )
                         )
-                        .order_by(Reservation.parking_timestamp.desc())
-                        .all()
         )
     else:
-        reservations = Reservation.query.order_by(Reservation.parking_timestamp.desc()).all()
+        reservations = Reservation.query
 
-    return render_template('admin/all_reservations.html', user_logged_in=user_logged_in, reservations=reservations, current_time=current_time, query=query)
+    reservations = reservations.options(
+        joinedload(Reservation.user),
+        joinedload(Reservation.spot).joinedload(ParkingSpot.lot),
+        joinedload(Reservation.vehicle),
+    )
+    page = paginate(reservations, [Reservation.parking_timestamp, Reservation.id], descending=True)
+    reservations = page.items
+
+    return render_template('admin/all_reservations.html', user_logged_in=user_logged_in, reservations=reservations, page=page, current_time=current_time, query=query)
 
 
 # --------------------------
@@ -322,53 +327,22 @@ def all_reservations():
 # --------------------------
 @admin_bp.route('/summary', methods=['GET'])
 @admin_required
+@read_replica
 def summary():
     user_logged_in = 'user_id' in session
 
-    total_users = User.query.count()
-    total_lots = ParkingLot.query.count()
-    total_spots = ParkingSpot.query.count()
-    total_reservations = Reservation.query.count()
-
-    all_costs = [r.parking_cost for r in Reservation.query.filter(Reservation.parking_cost != None).all()]
-    total_revenue = sum(all_costs)
-
-    booked_spots = ParkingSpot.query.filter_by(status='O').count()
-    vacant_spots = ParkingSpot.query.filter_by(status='A').count()
-
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    dates = [(today - timedelta(days=x)) for x in range(6, -1, -1)]
-    date_strs = [d.strftime('%d-%b') for d in dates]
+    days = parse_window(request.args.get('days'))
 
-    res_counts = []
-    rev_amounts = []
+    totals = get_admin_totals()
+    date_strs, res_counts, rev_amounts = get_daily_lot_stats(days)
 
-    for day in dates:
-        next_day = day + timedelta(days=1)
-
-        count = Reservation.query.filter(
-            Reservation.parking_timestamp >= day,
-            Reservation.parking_timestamp < next_day
-        ).count()
-
-        total = (
-            Reservation.query
-            .with_entities(func.sum(Reservation.parking_cost))
-            .filter(
-                Reservation.parking_timestamp >= day,
-                Reservation.parking_timestamp < next_day
-            )
-            .scalar()
-        ) or 0
-
-        res_counts.append(count)
-        rev_amounts.append(float(total))
-
-    recent_reservations = (
-        Reservation.query
+    recent_reservations = gather(
+        lambda: Reservation.query
+        .options(joinedload(Reservation.user), joinedload(Reservation.spot).joinedload(ParkingSpot.lot))
         .order_by(Reservation.parking_timestamp.desc())
         .limit(5)
-        .all()
+        .all(),
+        key=lambda reservation: reservation.parking_timestamp, reverse=True, limit=5
     )
 
     recent_users = (
@@ -381,17 +355,27 @@ def summary():
     return render_template(
         'admin/summary.html',
         user_logged_in=user_logged_in,
-        total_users=total_users,
-        total_lots=total_lots,
-        total_spots=total_spots,
-        total_reservations=total_reservations,
-        total_revenue=f"{total_revenue:.2f}",
-        booked_spots=booked_spots,
-        vacant_spots=vacant_spots,
+        total_users=totals['total_users'],
+        total_lots=totals['total_lots'],
+        total_spots=totals['total_spots'],
+        total_reservations=totals['total_reservations'],
+        total_revenue=f"{totals['total_revenue']:.2f}",
+        booked_spots=totals['booked_spots'],
+        vacant_spots=totals['vacant_spots'],
         recent_reservations=recent_reservations,
         recent_users=recent_users,
         reservations_chart_labels=date_strs,
         reservations_chart_data=res_counts,
         revenue_chart_labels=date_strs,
-        revenue_chart_data=rev_amounts
-    )
\ No newline at end of file
+        revenue_chart_data=rev_amounts,
+        days=days,
+        windows=SUMMARY_WINDOWS
+    )
+
+# --------------------------
+# Cache Stats
+# --------------------------
+@admin_bp.route('/cache_stats', methods=['GET'])
+@admin_required
+def cache_stats():
+    return jsonify(lots=lot_cache().stats(), fragments=fragment_cache().stats())
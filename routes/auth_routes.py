@@ -1,7 +1,7 @@
 from flask import Blueprint, request, render_template, redirect, flash, url_for, session
 from models import db, User
-from werkzeug.security import check_password_hash, generate_password_hash
-from decorators import auth_required
+from decorators import auth_required, throttled
+from services import hash_password, verify_password, email_wait, login_failed
 
 
 auth_bp = Blueprint('auth', __name__)
@@ -17,6 +17,7 @@ def register():
     return render_template('auth/register.html', email=email, full_name=full_name)
 
 @auth_bp.route('/register', methods=['POST'])
+@throttled('auth.register')
 def register_post():
     email = request.form.get('email').strip()
     full_name = request.form.get('full_name').strip()
@@ -37,7 +38,7 @@ def register_post():
         flash('Password mismatched!', 'danger')
         return redirect(url_for('auth.register', email=email, full_name=full_name))
     
-    password_hash = generate_password_hash(password)
+    password_hash = hash_password(password)
 
     user = User(email=email, password=password_hash, full_name=full_name)
     db.session.add(user)
@@ -59,6 +60,7 @@ def login():
     return render_template('auth/login.html', email=email)
 
 @auth_bp.route('/login', methods=['POST'])
+@throttled('auth.login')
 def login_post():
     email = request.form.get('email').strip()
     password = request.form.get('password').strip()
@@ -66,6 +68,11 @@ def login_post():
     if not email or not password:
         flash('Please fill the required fields.', 'danger')
         return redirect(url_for('auth.login'))
+
+    wait = email_wait(email)
+    if wait:
+        flash(f'Too many failed attempts for this account. Please try again in {wait} seconds.', 'danger')
+        return redirect(url_for('auth.login', email=email))
     
     user = User.query.filter_by(email=email).first()
 
@@ -73,9 +80,13 @@ def login_post():
         flash('Email not registered! Please use valid Email ID.', 'danger')
         return redirect(url_for('auth.login'))
     
-    if not check_password_hash(user.password, password):
+    if not verify_password(user, password):
+        login_failed(email)
         flash('Incorrect Password! Please enter the correct password.', 'danger')
         return redirect(url_for('auth.login', email=email))
+
+    # Saves the hash verify_password() renewed, if the configured cost changed.
+    db.session.commit()
     
     session['user_id'] = user.id
     session['is_admin'] = user.is_admin
@@ -0,0 +1,37 @@
+from flask import Blueprint, Response, request, current_app
+from services import occupancy_events, sse_stream, BrokerFull
+
+
+events_bp = Blueprint('events', __name__)
+
+
+# --------------------------
+# Live Occupancy Stream
+# --------------------------
+@events_bp.route('/occupancy', methods=['GET'])
+def occupancy():
+    """
+    Server-Sent Events stream of occupancy changes, one event per booking,
+    release or lot edit. ?lot=<id> (repeatable) limits it to those lots.
+
+    Each open stream holds a worker thread, so past EVENTS_MAX_SUBSCRIBERS
+    streams in this process new ones are turned away with 503; pages then
+    simply go without live updates.
+    """
+    lot_ids = set(request.args.getlist('lot', type=int))
+    keep = (lambda event: event['lot_id'] in lot_ids) if lot_ids else None
+
+    try:
+        queue = occupancy_events.subscribe(current_app.config.get('EVENTS_MAX_SUBSCRIBERS'))
+    except BrokerFull:
+        return Response('Too many open event streams.\n', status=503, mimetype='text/plain',
+                        headers={'Retry-After': '30'})
+
+    response = Response(
+        sse_stream(occupancy_events, queue, 'occupancy', keep),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # Also frees the slot of a client that left before the stream started.
+    response.call_on_close(lambda: occupancy_events.unsubscribe(queue))
+    return response
@@ -0,0 +1,13 @@
+from flask import Blueprint, Response
+from services import render_metrics
+
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+# --------------------------
+# Prometheus Scrape Endpoint
+# --------------------------
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
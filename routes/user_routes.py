@@ -1,10 +1,30 @@
-from flask import Blueprint, request, render_template, redirect, flash, url_for, session
+from flask import Blueprint, request, render_template, redirect, flash, url_for, session, jsonify
 from models import db, User, Vehicle, Address, ParkingLot, ParkingSpot, Reservation
-from datetime import datetime, timedelta
-from sqlalchemy import func, or_
-from werkzeug.security import check_password_hash, generate_password_hash
-from decorators import auth_required
-from math import ceil
+from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+from decorators import auth_required, conditional, read_replica, sharded, throttled
+from services import (
+    get_lot_occupancy,
+    get_lot_grid,
+    SPOT_WINDOW,
+    MAX_SPOT_WINDOW,
+    lot_page,
+    paginate,
+    matching_vehicle_ids,
+    reserve_spot,
+    release_reservation,
+    get_user_totals,
+    get_daily_reservation_stats,
+    parse_window,
+    SUMMARY_WINDOWS,
+    lot_booking_validator,
+    profile_validator,
+    history_validator,
+    gather,
+    hash_password,
+    password_hasher,
+)
 
 
 user_bp = Blueprint('user', __name__)
@@ -14,48 +34,49 @@ user_bp = Blueprint('user', __name__)
 # Home Page
 # --------------------------
 @user_bp.route('/', methods=['GET'])
+@read_replica
 def index():
     user_logged_in = 'user_id' in session
     current_time = datetime.utcnow()
     query = request.args.get('query', '').strip()
 
-    if query:
-        search = f'%{query}%'
-        parking_lots = (
-                        ParkingLot.query
-                        .join(ParkingLot.address)
-                        .filter(
-                            or_(
-                                ParkingLot.prime_location_name.ilike(search),
-                                Address.address.ilike(search),
-                                Address.city.ilike(search),
-                                Address.state.ilike(search),
-                                Address.pincode.ilike(search)
-                            )
-                        ).all()
-        )
-    else:
-        parking_lots = ParkingLot.query.all()
+    page = lot_page(query)
+    parking_lots = page.items
+
+    occupancy = get_lot_occupancy([lot.id for lot in parking_lots])
     
     if user_logged_in:
-        all_reservations = (
-            Reservation.query
+        booking_loaders = (
+            joinedload(Reservation.spot).joinedload(ParkingSpot.lot).joinedload(ParkingLot.address),
+            joinedload(Reservation.vehicle),
+        )
+
+        parked_at = lambda reservation: reservation.parking_timestamp
+
+        all_reservations = gather(
+            lambda: Reservation.query
+            .options(*booking_loaders)
             .filter_by(user_id=session['user_id'])
             .order_by(Reservation.parking_timestamp.desc())
             .limit(4)
-            .all()
+            .all(),
+            key=parked_at, reverse=True, limit=4
         )
 
-        active_reservations = (
-            Reservation.query
+        active_reservations = gather(
+            lambda: Reservation.query
+            .options(*booking_loaders)
             .filter_by(user_id=session['user_id'], status="A")
             .order_by(Reservation.parking_timestamp.desc())
-            .all()
+            .all(),
+            key=parked_at, reverse=True
         )
 
         return render_template('user/index.html',
                             user_logged_in=user_logged_in,
                             parking_lots=parking_lots,
+                            page=page,
+                            occupancy=occupancy,
                             all_reservations=all_reservations,
                             active_reservations=active_reservations,
                             current_time=current_time,
@@ -65,7 +86,10 @@ def index():
     return render_template('user/index.html',
                             user_logged_in=user_logged_in,
                             parking_lots=parking_lots,
-                            current_time=current_time
+                            page=page,
+                            occupancy=occupancy,
+                            current_time=current_time,
+                            query=query
                             )
 
 
@@ -75,60 +99,94 @@ def index():
 # --------------------------
 @user_bp.route('/<int:lot_id>/view_slot', methods=['GET'])
 @auth_required
+@conditional(lot_booking_validator)
 def view_slot(lot_id):
     user_logged_in = 'user_id' in session
-    lot = ParkingLot.query.get(lot_id)
+    lot = ParkingLot.query.options(joinedload(ParkingLot.address)).get(lot_id)
     vehicles = Vehicle.query.filter_by(user_id=session['user_id'], is_parked_in=False).all()
 
     return render_template('user/view_spot.html', user_logged_in=user_logged_in, lot=lot, vehicles=vehicles)
 
 
+# --------------------------
+# Spot Grid Window
+# --------------------------
+@user_bp.route('/<int:lot_id>/spots', methods=['GET'])
+@auth_required
+def lot_spots(lot_id):
+    if not ParkingLot.query.get(lot_id):
+        return jsonify(error='Parking Lot does not exist.'), 404
+
+    start = request.args.get('start', 1, type=int)
+    count = min(request.args.get('count', SPOT_WINDOW, type=int), MAX_SPOT_WINDOW)
+
+    # Windows come from the in-memory grid, so they are validated by content.
+    response = jsonify(get_lot_grid(lot_id).window(start, count))
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 # --------------------------
 # Spot Booking Page
 # --------------------------
 @user_bp.route('/book_spot/<int:spot_id>', methods=['POST'])
 @auth_required
+@sharded
 def book_spot_post(spot_id):
     spot = ParkingSpot.query.get(spot_id)
-    vehicle_id = request.form.get('vehicle_id')
-    vehicle = Vehicle.query.get(vehicle_id)
+    vehicle_id = request.form.get('vehicle_id', type=int)
 
     if not spot:
         flash('Spot does not exist.', 'danger')
-        return redirect(url_for('user.view_spot'))
-    
-    if spot.status != 'A':
-        flash('Spot is not available.', 'danger')
-        return redirect(url_for('user.view_spot'))
-    
-    if not vehicle or vehicle.is_parked_in:
-        flash('Invalid or already parked vehicle selected.', 'danger')
-        return redirect(url_for('user.view_spot'))
-
-    spot.status = 'O'
-    vehicle.is_parked_in = True
-
-    new_reservation = Reservation(
-        user_id=session['user_id'],
-        spot_id=spot.id,
-        vehicle_id=vehicle.id,
-        parking_timestamp=datetime.utcnow(),
-        status='A'
-    )
+        return redirect(url_for('user.index'))
 
-    db.session.add(new_reservation)
-    db.session.commit()
+    reservation, error = reserve_spot(session['user_id'], vehicle_id, spot.lot_id, spot_id=spot.id)
+
+    if error:
+        flash(error, 'danger')
+        return redirect(url_for('user.view_slot', lot_id=spot.lot_id))
+
+    if reservation.spot_id != spot_id:
+        flash(f'Spot was just taken. Spot {reservation.spot.spot_number} booked instead.', 'warning')
+        return redirect(url_for('user.index'))
 
     flash('Spot booked successfully.', 'success')
     return redirect(url_for('user.index'))
 
 
+# --------------------------
+# Auto-assign Spot Booking
+# --------------------------
+@user_bp.route('/<int:lot_id>/book_spot', methods=['POST'])
+@auth_required
+@sharded
+def book_any_spot_post(lot_id):
+    lot = ParkingLot.query.get(lot_id)
+    vehicle_id = request.form.get('vehicle_id', type=int)
+
+    if not lot:
+        flash('Parking Lot does not exist.', 'danger')
+        return redirect(url_for('user.index'))
+
+    reservation, error = reserve_spot(session['user_id'], vehicle_id, lot_id)
+
+    if error:
+        flash(error, 'danger')
+        return redirect(url_for('user.view_slot', lot_id=lot_id))
+
+    flash(f'Spot {reservation.spot.spot_number} booked successfully.', 'success')
+    return redirect(url_for('user.index'))
+
+
 
 # --------------------------
 # Slot Releasing Page
 # --------------------------
 @user_bp.route('/<int:booking_id>/release_slot', methods=['POST'])
 @auth_required
+@sharded
 def release_slot(booking_id):
     booking = Reservation.query.get(booking_id)
 
@@ -140,23 +198,11 @@ def release_slot(booking_id):
         flash('Slot already released.', 'danger')
         return redirect(url_for('user.index'))
 
-    now = datetime.utcnow()
-
-    price = booking.spot.lot.price_per_hour
-    duration = ceil((now - booking.parking_timestamp).total_seconds() / 3600)
-    total_cost = duration * price
+    total_cost = release_reservation(booking)
 
-    booking.spot.status = 'A'  # 'A' for available
-    
-    if booking.vehicle:
-        booking.vehicle.is_parked_in = False
-    
-    booking.status = 'R'  # 'R' for released
-    
-    booking.leaving_timestamp = now
-    booking.parking_cost = total_cost
-
-    db.session.commit()
+    if total_cost is None:
+        flash('Slot already released.', 'danger')
+        return redirect(url_for('user.index'))
 
     flash(f'Slot released successfully. Total cost: ₹{total_cost}', 'success')
     return redirect(url_for('user.index'))
@@ -167,14 +213,26 @@ def release_slot(booking_id):
 # --------------------------
 @user_bp.route('/profile', methods=['GET'])
 @auth_required
+@conditional(profile_validator)
 def profile():
     user_logged_in = 'user_id' in session
 
-    user = User.query.get(session['user_id'])
+    user = User.query.options(joinedload(User.address), selectinload(User.vehicles)).get(session['user_id'])
+
+    parked_reservations = {
+        reservation.vehicle_id: reservation
+        for reservation in gather(
+            lambda: Reservation.query
+            .filter_by(user_id=user.id, status='A')
+            .options(joinedload(Reservation.spot).joinedload(ParkingSpot.lot).joinedload(ParkingLot.address))
+            .all()
+        )
+    }
 
     return render_template('user/profile.html', 
                            user_logged_in=user_logged_in,
-                           user=user
+                           user=user,
+                           parked_reservations=parked_reservations
                            )
 
 
@@ -244,6 +302,7 @@ def delete_vehicle(vehicle_id):
         return redirect(url_for('user.profile'))
     
     db.session.delete(vehicle)
+    vehicle.owner.updated_at = datetime.utcnow()
     db.session.commit()
 
     flash('Vehicle deleted successfully.', 'success')
@@ -317,6 +376,7 @@ def edit_address():
     user.address.pincode = pincode
     user.address.state = state
     user.address.country = country
+    user.updated_at = datetime.utcnow()
 
     db.session.commit()
 
@@ -360,6 +420,7 @@ def update_profile():
 # --------------------------
 @user_bp.route('/update_password', methods=['POST'])
 @auth_required
+@throttled('user.profile')
 def update_password():
     
     user = User.query.get(session['user_id'])
@@ -372,10 +433,6 @@ def update_password():
         flash('Please fill all details.', 'danger')
         return redirect(url_for('user.profile'))
     
-    if not check_password_hash(user.password, current_password):
-        flash('Incorrect current password.', 'danger')
-        return redirect(url_for('user.profile'))
-    
     if new_password != confirm_new_password:
         flash('Password mismatched!', 'danger')
         return redirect(url_for('user.profile'))
@@ -384,7 +441,11 @@ def update_password():
         flash('New password is same as current passsword.', 'danger')
         return redirect(url_for('user.profile'))
 
-    user.password = generate_password_hash(new_password)
+    if not password_hasher().verify(user.password, current_password):
+        flash('Incorrect current password.', 'danger')
+        return redirect(url_for('user.profile'))
+
+    user.password = hash_password(new_password)
 
     db.session.commit()
 
@@ -397,6 +458,8 @@ def update_password():
 # --------------------------
 @user_bp.route('/history', methods=['GET'])
 @auth_required
+@read_replica
+@conditional(history_validator)
 def history():
     user_logged_in = 'user_id' in session
     current_time = datetime.utcnow()
@@ -407,90 +470,65 @@ def history():
         reservations = (
                         Reservation.query
                         .join(ParkingSpot, Reservation.spot)
-                        .join(Vehicle, Reservation.vehicle)
-                        .filter_by(user_id=session['user_id'])
+                        .filter(Reservation.user_id == session['user_id'])
                         .filter(
                             or_(
                                 ParkingSpot.spot_number.ilike(search),
-                                Vehicle.vehicle_number.ilike(search),
-                                Vehicle.vehicle_type.ilike(search),
+                                Reservation.vehicle_id.in_(matching_vehicle_ids(query)),
                             )
                         )
-                        .order_by(Reservation.parking_timestamp.desc())
-                        .all()
         )
     else:
-        reservations = (
-                    Reservation.query
-                    .filter_by(user_id=session['user_id'])
-                    .order_by(Reservation.parking_timestamp.desc())
-                    .all()
-                )
+        reservations = Reservation.query.filter_by(user_id=session['user_id'])
+
+    reservations = reservations.options(
+        joinedload(Reservation.spot).joinedload(ParkingSpot.lot),
+        joinedload(Reservation.vehicle),
+    )
+    page = paginate(reservations, [Reservation.parking_timestamp, Reservation.id], descending=True)
+    reservations = page.items
 
-    return render_template('user/history.html', user_logged_in=user_logged_in, reservations=reservations, current_time=current_time, query=query)
+    return render_template('user/history.html', user_logged_in=user_logged_in, reservations=reservations, page=page, current_time=current_time, query=query)
 
 # --------------------------
 # Summary Page
 # --------------------------
 @user_bp.route('/summary', methods=['GET'])
 @auth_required
+@read_replica
 def summary():
     user_logged_in = 'user_id' in session
     user = User.query.get(session['user_id'])
 
-    total_bookings = Reservation.query.filter_by(user_id=user.id).count()
-    active_bookings = Reservation.query.filter_by(user_id=user.id, leaving_timestamp=None).count()
-    total_vehicles = Vehicle.query.filter_by(user_id=user.id).count()
-    all_costs = [r.parking_cost for r in Reservation.query.filter_by(user_id=user.id).filter(Reservation.parking_cost != None).all()]
-    total_spent = sum(all_costs)
+    days = parse_window(request.args.get('days'))
 
-    favourite_lot = db.session.query(
-        ParkingLot.prime_location_name,
-        func.count(Reservation.id).label('count')
-    ).join(ParkingLot.spots).join(ParkingSpot.reservations).filter(Reservation.user_id == user.id).group_by(ParkingLot.id).order_by(func.count(Reservation.id).desc()).first()
-
-    favourite_lot_name = favourite_lot[0] if favourite_lot else None
-
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    dates = [today - timedelta(days=i) for i in range(6, -1, -1)]
-    spending_labels = [d.strftime('%d-%b') for d in dates]
+    totals = get_user_totals(user.id)
+    spending_labels, bookings_data, spending_data = get_daily_reservation_stats(
+        days, filters=(Reservation.user_id == user.id,)
+    )
     bookings_labels = spending_labels.copy()
 
-    spending_data = []
-    bookings_data = []
-
-    for d in dates:
-        next_day = d + timedelta(days=1)
-
-        day_spending = db.session.query(func.coalesce(func.sum(Reservation.parking_cost), 0)).filter(
-            Reservation.user_id == user.id,
-            Reservation.parking_timestamp >= d,
-            Reservation.parking_timestamp < next_day,
-        ).scalar()
-
-        day_bookings = db.session.query(func.count(Reservation.id)).filter(
-            Reservation.user_id == user.id,
-            Reservation.parking_timestamp >= d,
-            Reservation.parking_timestamp < next_day,
-        ).scalar()
-
-        spending_data.append(float(day_spending))
-        bookings_data.append(day_bookings)
-
-    recent_bookings = Reservation.query.filter_by(user_id=user.id).order_by(Reservation.parking_timestamp.desc()).limit(3).all()
+    recent_bookings = gather(
+        lambda: Reservation.query.filter_by(user_id=user.id).options(
+            joinedload(Reservation.spot).joinedload(ParkingSpot.lot), joinedload(Reservation.vehicle)
+        ).order_by(Reservation.parking_timestamp.desc()).limit(3).all(),
+        key=lambda reservation: reservation.parking_timestamp, reverse=True, limit=3
+    )
 
     return render_template(
                            'user/summary.html',
                            user_logged_in=user_logged_in,
                            user_name=user.full_name,
-                           total_bookings=total_bookings,
-                           active_bookings=active_bookings,
-                           total_vehicles=total_vehicles,
-                           total_spent=f"{total_spent:.2f}",
-                           favourite_lot=favourite_lot_name,
+                           total_bookings=totals['total_bookings'],
+                           active_bookings=totals['active_bookings'],
+                           total_vehicles=totals['total_vehicles'],
+                           total_spent=f"{totals['total_spent']:.2f}",
+                           favourite_lot=totals['favourite_lot'],
                            spending_labels=spending_labels,
                            spending_data=spending_data,
                            bookings_labels=bookings_labels,
                            bookings_data=bookings_data,
-                           recent_bookings=recent_bookings
+                           recent_bookings=recent_bookings,
+                           days=days,
+                           windows=SUMMARY_WINDOWS
                         )
\ No newline at end of file
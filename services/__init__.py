@@ -0,0 +1,21 @@
+from .occupancy import SPOT_WINDOW, MAX_SPOT_WINDOW, get_lot_occupancy, get_lot_grid, get_lot_grids, rebuild_lot_grids, mark_spot, refresh_lot_grid, drop_lot_grid
+from .events import occupancy_events, sse_stream, Broker, BrokerFull
+from .booking import reserve_spot, release_reservation
+from .analytics import get_admin_totals, get_user_totals, get_daily_reservation_stats, get_daily_lot_stats, parse_window, SUMMARY_WINDOWS
+from .rollup import record_booking, record_release, record_removal, backfill_daily_stats, backfill_if_empty
+from .search import lot_search, user_search, create_search_index, rebuild_search_index, search_lots, search_users, matching_lot_ids, matching_user_ids, matching_vehicle_ids
+from .pagination import paginate, Page, PAGE_SIZES
+from .cache import StatsCache
+from .listings import lot_page, lot_cache, invalidate_lots, LotListing
+from .fragments import fragment_cache, init_fragment_cache
+from .provisioning import provision_lot, resize_lot, add_spots, remove_spots_above
+from .freshness import lot_validator, lot_booking_validator, profile_validator, history_validator
+from .compression import init_compression, compress_response
+from .metrics import init_metrics, render_metrics, RequestTimings
+from .profiling import init_profiling, StackSampler, slow_query_log
+from .seeding import seed_synthetic
+from .sqlite_tuning import configure_engine_options, init_sqlite, SQLITE_PROFILES
+from .read_routing import configure_read_replica, init_read_routing, recently_wrote, replica_uri
+from .sharding import shard_count, configure_shards, init_sharding, create_shards, shard_for_region, assign_shard, shard_of_lot, shard_of_row, forget_lot_shard, current_shard, on_shard, each_shard, gather, SHARD_ID_SPAN
+from .passwords import password_hasher, hash_password, verify_password, PasswordHasher, HashingBusy
+from .throttling import throttle_ip, email_wait, login_failed, TokenBucket
@@ -0,0 +1,168 @@
+from models import db, User, Vehicle, ParkingLot, ParkingSpot, Reservation, DailyLotStats
+from datetime import datetime, timedelta, date
+from sqlalchemy import func, select
+from .sharding import each_shard, gather
+
+
+# Windows offered on the summary pages, in days.
+SUMMARY_WINDOWS = (7, 30, 90, 365)
+
+
+def parse_window(value, default=7):
+    """Maps a ?days= query value onto one of SUMMARY_WINDOWS."""
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return default
+    return days if days in SUMMARY_WINDOWS else default
+
+
+def parse_day(value):
+    # SQLite returns date() as 'YYYY-MM-DD'; other backends return a date.
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _window_start(days):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days - 1)
+
+
+def _fill_series(start, days, by_day):
+    """Turns {date: (count, revenue)} into (labels, counts, revenue) with zero days filled."""
+    dates = [(start + timedelta(days=i)).date() for i in range(days)]
+    label_format = '%d-%b' if days <= 90 else '%d-%b-%y'
+
+    labels = [d.strftime(label_format) for d in dates]
+    counts = [by_day.get(d, (0, 0.0))[0] for d in dates]
+    revenue = [by_day.get(d, (0, 0.0))[1] for d in dates]
+
+    return labels, counts, revenue
+
+
+def _sum_by_day(rows):
+    """Turns (day, count, revenue) rows into {date: (count, revenue)}, adding up days that several shards report."""
+    by_day = {}
+    for d, count, revenue in rows:
+        d = parse_day(d)
+        total_count, total_revenue = by_day.get(d, (0, 0.0))
+        by_day[d] = (total_count + int(count), total_revenue + float(revenue))
+    return by_day
+
+
+# --------------------------
+# Daily Reservation Series
+# --------------------------
+def get_daily_reservation_stats(days=7, filters=()):
+    """
+    Returns (labels, counts, revenue) for the last `days` days, oldest first,
+    from one GROUP BY date(parking_timestamp) query. Days without bookings
+    are filled with zeros. `filters` are extra SQLAlchemy criteria on Reservation.
+    """
+    start = _window_start(days)
+
+    day = func.date(Reservation.parking_timestamp)
+    rows = gather(
+        db.session.query(
+            day,
+            func.count(Reservation.id),
+            func.coalesce(func.sum(Reservation.parking_cost), 0),
+        )
+        .filter(Reservation.parking_timestamp >= start, *filters)
+        .group_by(day)
+        .all
+    )
+
+    return _fill_series(start, days, _sum_by_day(rows))
+
+
+def get_daily_lot_stats(days=7, filters=()):
+    """
+    Same series as get_daily_reservation_stats(), read from the DailyLotStats
+    rollup, so the cost depends on lots x days instead of on reservations.
+    `filters` are extra SQLAlchemy criteria on DailyLotStats.
+    """
+    start = _window_start(days)
+
+    rows = gather(
+        db.session.query(
+            DailyLotStats.day,
+            func.sum(DailyLotStats.reservation_count),
+            func.sum(DailyLotStats.revenue),
+        )
+        .filter(DailyLotStats.day >= start.date(), *filters)
+        .group_by(DailyLotStats.day)
+        .all
+    )
+
+    return _fill_series(start, days, _sum_by_day(rows))
+
+
+# --------------------------
+# Admin Totals
+# --------------------------
+def get_admin_totals():
+    """Returns every headline figure of the admin summary in one round trip per shard."""
+    shards = each_shard(lambda: db.session.execute(
+        select(
+            select(func.count(User.id)).scalar_subquery().label('total_users'),
+            select(func.count(ParkingLot.id)).scalar_subquery().label('total_lots'),
+            select(func.count(ParkingSpot.id)).scalar_subquery().label('total_spots'),
+            select(func.count(ParkingSpot.id)).where(ParkingSpot.status == 'O').scalar_subquery().label('booked_spots'),
+            select(func.coalesce(func.sum(DailyLotStats.reservation_count), 0)).scalar_subquery().label('total_reservations'),
+            select(func.coalesce(func.sum(DailyLotStats.revenue), 0)).scalar_subquery().label('total_revenue'),
+        )
+    ).one()._asdict())
+
+    # Users and lots are in the catalog every shard sees; the rest adds up.
+    totals = shards[0]
+    for shard in shards[1:]:
+        for name in ('total_spots', 'booked_spots', 'total_reservations', 'total_revenue'):
+            totals[name] += shard[name]
+
+    totals['vacant_spots'] = totals['total_spots'] - totals['booked_spots']
+    totals['total_revenue'] = float(totals['total_revenue'])
+    return totals
+
+
+# --------------------------
+# User Totals
+# --------------------------
+def get_user_totals(user_id):
+    """Returns every headline figure of a user's summary in one round trip per shard."""
+    def favourite_lot(column):
+        return (
+            select(column)
+            .select_from(ParkingLot)
+            .join(ParkingSpot, ParkingSpot.lot_id == ParkingLot.id)
+            .join(Reservation, Reservation.spot_id == ParkingSpot.id)
+            .where(Reservation.user_id == user_id)
+            .group_by(ParkingLot.id)
+            .order_by(func.count(Reservation.id).desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    shards = each_shard(lambda: db.session.execute(
+        select(
+            select(func.count(Reservation.id)).where(Reservation.user_id == user_id)
+                .scalar_subquery().label('total_bookings'),
+            select(func.count(Reservation.id)).where(Reservation.user_id == user_id, Reservation.leaving_timestamp.is_(None))
+                .scalar_subquery().label('active_bookings'),
+            select(func.count(Vehicle.id)).where(Vehicle.user_id == user_id)
+                .scalar_subquery().label('total_vehicles'),
+            select(func.coalesce(func.sum(Reservation.parking_cost), 0)).where(Reservation.user_id == user_id)
+                .scalar_subquery().label('total_spent'),
+            favourite_lot(ParkingLot.prime_location_name).label('favourite_lot'),
+            favourite_lot(func.count(Reservation.id)).label('favourite_lot_bookings'),
+        )
+    ).one()._asdict())
+
+    # A lot is on a single shard, so the favourite is the busiest shard's one.
+    totals = max(shards, key=lambda shard: shard['favourite_lot_bookings'] or 0)
+    for name in ('total_bookings', 'active_bookings', 'total_spent'):
+        totals[name] = sum(shard[name] for shard in shards)
+
+    totals['total_spent'] = float(totals['total_spent'])
+    return totals
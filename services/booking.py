@@ -0,0 +1,184 @@
+from models import db, ParkingSpot, Vehicle, Reservation
+from .rollup import record_booking, record_release
+from .occupancy import mark_spot
+from .sharding import current_shard
+from datetime import datetime
+from math import ceil
+import random
+
+
+# How many free spots a booking looks at per round, and how many rounds it
+# retries before giving up. Picking randomly among a few candidates keeps
+# concurrent bookings in the same lot from all racing for the same row.
+CLAIM_CANDIDATES = 8
+CLAIM_ROUNDS = 5
+
+
+# --------------------------
+# Free Spot Lookup
+# --------------------------
+def _free_spot_ids(lot_id, limit):
+    rows = (
+        db.session.query(ParkingSpot.id)
+        .filter_by(lot_id=lot_id, status='A')
+        .order_by(ParkingSpot.id)
+        .limit(limit)
+        .all()
+    )
+    return [row[0] for row in rows]
+
+
+# --------------------------
+# Compare-and-set Updates
+# --------------------------
+def claim_spot(spot_id):
+    """Flips a spot from 'A' to 'O' in one UPDATE. True only for the caller that won it."""
+    claimed = (
+        ParkingSpot.query
+        .filter_by(id=spot_id, status='A')
+        .update({'status': 'O', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    )
+    return claimed == 1
+
+
+def free_spot(spot_id):
+    """Flips a spot from 'O' back to 'A'. False if it was not occupied."""
+    freed = (
+        ParkingSpot.query
+        .filter_by(id=spot_id, status='O')
+        .update({'status': 'A', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    )
+    return freed == 1
+
+
+def claim_free_spot(lot_id):
+    """
+    Claims any available spot of a lot, retrying on other free spots when a
+    concurrent booking wins the race. Returns the claimed spot or None.
+    """
+    for _ in range(CLAIM_ROUNDS):
+        candidates = _free_spot_ids(lot_id, CLAIM_CANDIDATES)
+        if not candidates:
+            return None
+
+        random.shuffle(candidates)
+        for spot_id in candidates:
+            if claim_spot(spot_id):
+                return db.session.get(ParkingSpot, spot_id, populate_existing=True)
+
+    return None
+
+
+def claim_vehicle(vehicle_id, user_id):
+    """Marks a vehicle of the user as parked, unless it is already parked."""
+    claimed = (
+        Vehicle.query
+        .filter(
+            Vehicle.id == vehicle_id,
+            Vehicle.user_id == user_id,
+            Vehicle.is_parked_in.is_not(True),
+        )
+        .update({'is_parked_in': True, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    )
+    return claimed == 1
+
+
+def unpark_vehicle(vehicle_id):
+    Vehicle.query.filter_by(id=vehicle_id).update(
+        {'is_parked_in': False, 'updated_at': datetime.utcnow()}, synchronize_session=False
+    )
+
+
+# --------------------------
+# Booking & Release
+# --------------------------
+def reserve_spot(user_id, vehicle_id, lot_id, spot_id=None):
+    """
+    Books a spot for a vehicle without any application-level lock.
+
+    The vehicle and the spot are claimed with conditional UPDATEs. When
+    spot_id is given but a concurrent booking took it first, another free
+    spot of the same lot is claimed instead. Commits on success and returns
+    (reservation, None); rolls back and returns (None, message) otherwise.
+    """
+    if not claim_vehicle(vehicle_id, user_id):
+        db.session.rollback()
+        return None, 'Invalid or already parked vehicle selected.'
+
+    # On a shard of its own, the vehicle claim commits right away, so
+    # bookings on different shards only share the primary's write lock for
+    # that one UPDATE rather than for the whole booking.
+    claimed_apart = current_shard() != 0
+    if claimed_apart:
+        db.session.commit()
+
+    spot = None
+    if spot_id is not None and claim_spot(spot_id):
+        spot = db.session.get(ParkingSpot, spot_id, populate_existing=True)
+    else:
+        spot = claim_free_spot(lot_id)
+
+    if not spot:
+        db.session.rollback()
+        if claimed_apart:
+            unpark_vehicle(vehicle_id)
+            db.session.commit()
+        return None, 'No spots available in this parking lot.'
+
+    reservation = Reservation(
+        user_id=user_id,
+        spot_id=spot.id,
+        vehicle_id=vehicle_id,
+        parking_timestamp=datetime.utcnow(),
+        status='A'
+    )
+
+    db.session.add(reservation)
+    record_booking(spot, reservation.parking_timestamp)
+    lot_id, number = spot.lot_id, spot.spot_number
+    db.session.commit()
+
+    mark_spot(lot_id, number, 'O')
+
+    return reservation, None
+
+
+def release_reservation(booking):
+    """
+    Closes an active reservation and frees its spot and vehicle. The status
+    check is part of the UPDATE, so a reservation is only ever billed once.
+    Returns the total cost, or None if it had already been released.
+    """
+    now = datetime.utcnow()
+
+    price = booking.spot.lot.price_per_hour
+    duration = ceil((now - booking.parking_timestamp).total_seconds() / 3600)
+    total_cost = duration * price
+
+    closed = (
+        Reservation.query
+        .filter_by(id=booking.id, status='A')
+        .update(
+            {'status': 'R', 'leaving_timestamp': now, 'parking_cost': total_cost},
+            synchronize_session=False
+        )
+    )
+
+    if closed != 1:
+        db.session.rollback()
+        return None
+
+    free_spot(booking.spot_id)
+    record_release(booking, now, total_cost)
+    lot_id, number, vehicle_id = booking.spot.lot_id, booking.spot.spot_number, booking.vehicle_id
+
+    # On a shard of its own, the shard's part commits first and the vehicle
+    # is freed in a short transaction on the primary after it.
+    if current_shard() != 0:
+        db.session.commit()
+    unpark_vehicle(vehicle_id)
+    db.session.commit()
+
+    mark_spot(lot_id, number, 'A')
+
+    return total_cost
@@ -0,0 +1,58 @@
+from cachetools import TTLCache
+from threading import Lock
+
+
+# --------------------------
+# Counting Cache
+# --------------------------
+class StatsCache:
+    """
+    A thread-safe TTL + LRU cache that counts its hits and misses. Entries
+    expire after `ttl` seconds and the least recently used ones are evicted
+    beyond `maxsize`. A maxsize of 0 disables it. A value loaded while
+    clear() ran is returned but not stored, since it may predate the write.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        with self._lock:
+            try:
+                value = self._cache[key]
+                self.hits += 1
+                return value
+            except KeyError:
+                self.misses += 1
+            generation = self._generation
+
+        value = load()
+        with self._lock:
+            if generation != self._generation:
+                return value
+            try:
+                self._cache[key] = value
+            except ValueError:
+                pass  # a zero-sized cache stores nothing
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'size': len(self._cache),
+                'maxsize': self._cache.maxsize,
+                'ttl': self._cache.ttl,
+            }
@@ -0,0 +1,58 @@
+from flask import current_app, request
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE = {'text/html', 'application/json'}
+
+# Brotli's higher qualities are meant for static assets; 5 compresses these
+# pages better than gzip -6 in about the same time.
+BROTLI_QUALITY = 5
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=current_app.config.get('COMPRESS_LEVEL', 6), mtime=0)
+
+
+def compress_response(response):
+    """
+    Gzip- or brotli-encodes HTML and JSON bodies of at least COMPRESS_MIN_SIZE
+    bytes for clients that accept it. Streams (such as the occupancy events)
+    and bodies that are already encoded are left alone.
+    """
+    if (
+        response.status_code != 200
+        or response.mimetype not in COMPRESSIBLE
+        or response.is_streamed
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if len(response.get_data()) < current_app.config.get('COMPRESS_MIN_SIZE', 500):
+        return response
+
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli else ['gzip'])
+    if not encoding:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    # The encoded body is a different representation of the same page, so
+    # its validator is only weakly equal to the page's own.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -0,0 +1,87 @@
+from queue import Queue, Empty, Full
+from threading import Lock
+import json
+
+
+# Events a subscriber may fall behind by before it is dropped, and how often
+# an idle stream sends a comment so proxies do not close it.
+SUBSCRIBER_BACKLOG = 256
+KEEPALIVE_SECONDS = 15
+
+
+# --------------------------
+# In-process Pub/Sub
+# --------------------------
+class BrokerFull(Exception):
+    """The broker already has as many subscribers as it allows."""
+
+
+class Broker:
+    """
+    Fans events out to every subscribed queue in this process. Publishing
+    never blocks: a subscriber whose queue is full is dropped and handed a
+    None, which ends its stream so the client reconnects and resyncs.
+    """
+
+    def __init__(self, backlog=SUBSCRIBER_BACKLOG):
+        self.backlog = backlog
+        self._subscribers = set()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, limit=None):
+        """A new subscriber queue; raises BrokerFull if `limit` subscribers are already in."""
+        queue = Queue(self.backlog)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                raise BrokerFull()
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for queue in subscribers:
+            try:
+                queue.put_nowait(event)
+            except Full:
+                self.unsubscribe(queue)
+                with queue.mutex:
+                    queue.queue.clear()
+                queue.put_nowait(None)
+
+
+occupancy_events = Broker()
+
+
+# --------------------------
+# Server-Sent Events
+# --------------------------
+def sse_stream(broker, queue, name, keep=None):
+    """
+    Yields the events of `queue`, subscribed to `broker`, in
+    text/event-stream format as `name` events, optionally only those
+    `keep(event)` accepts. Unsubscribes once the client goes away.
+    """
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                event = queue.get(timeout=KEEPALIVE_SECONDS)
+            except Empty:
+                yield ': keepalive\n\n'
+                continue
+
+            if event is None:
+                return
+            if keep is None or keep(event):
+                yield f'event: {name}\ndata: {json.dumps(event)}\n\n'
+    finally:
+        broker.unsubscribe(queue)
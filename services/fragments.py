@@ -0,0 +1,62 @@
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from .cache import StatsCache
+
+
+# --------------------------
+# Rendered Fragment Cache
+# --------------------------
+def fragment_cache():
+    """The app's fragment cache, created from FRAGMENT_CACHE_SIZE / FRAGMENT_CACHE_TTL on first use."""
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('fragment_cache', StatsCache(
+            maxsize=current_app.config.get('FRAGMENT_CACHE_SIZE', 2048),
+            ttl=current_app.config.get('FRAGMENT_CACHE_TTL', 600),
+        ))
+    return cache
+
+
+def _freeze(value):
+    """Makes a key part hashable: lists become tuples and dicts sorted item tuples."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Adds a `{% cache key, ... %}...{% endcache %}` tag that renders its body
+    once per distinct key and serves the stored HTML afterwards.
+
+    The key should be everything the body shows, e.g. a lot snapshot and
+    its occupancy counts: when the lot or its occupancy changes, the key
+    changes with it and the old entry is simply never hit again and ages
+    out of the LRU. The template and line are added to the key, so the same
+    values can key different blocks.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        key = [nodes.Const(parser.name), nodes.Const(lineno), parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.List(key)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        return fragment_cache().get(_freeze(key), lambda: Markup(caller()))
+
+
+def init_fragment_cache(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
@@ -0,0 +1,104 @@
+from flask import current_app, request, session
+from sqlalchemy import func, select
+from models import db, User, ParkingLot, Vehicle, Reservation
+from .sharding import each_shard
+from hashlib import sha1
+from datetime import datetime
+
+
+# Pages rendered by an older deploy must not validate against a newer one,
+# so every ETag is salted with ETAG_VERSION (the process start by default).
+STARTED_AT = datetime.utcnow().isoformat()
+
+
+def page_etag(*parts):
+    """
+    A strong ETag for the current page: the URL, who is looking at it and
+    the `parts` the page was rendered from.
+    """
+    key = (
+        current_app.config.get('ETAG_VERSION') or STARTED_AT,
+        request.full_path,
+        session.get('user_id'),
+        session.get('is_admin'),
+    ) + parts
+    return sha1(repr(key).encode(), usedforsecurity=False).hexdigest()
+
+
+def latest(*timestamps):
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+
+# --------------------------
+# Page Validators
+# --------------------------
+# Each returns the (etag, last_modified) a page would be served with, from a
+# single query (per shard, for reservations) over the timestamps behind it,
+# or None when the page cannot be validated (the view then renders as usual).
+def lot_validator(lot_id):
+    """Admin lot view: the lot and its address; spots load from the spots endpoint."""
+    updated_at = db.session.scalar(select(ParkingLot.updated_at).where(ParkingLot.id == lot_id))
+    if updated_at is None:
+        return None
+    return page_etag(updated_at), updated_at
+
+
+def lot_booking_validator(lot_id):
+    """User lot view: the lot plus the user's vehicles that are free to book with."""
+    free_vehicles = (Vehicle.user_id == session['user_id'], Vehicle.is_parked_in == False)
+    row = db.session.execute(
+        select(
+            ParkingLot.updated_at,
+            select(func.max(Vehicle.updated_at)).where(*free_vehicles).scalar_subquery(),
+            select(func.count(Vehicle.id)).where(*free_vehicles).scalar_subquery(),
+        ).where(ParkingLot.id == lot_id)
+    ).first()
+    if row is None:
+        return None
+    return page_etag(*row), latest(row[0], row[1])
+
+
+def profile_validator():
+    """Profile: the user, their address and vehicles, and where they are parked."""
+    user_id = session['user_id']
+    rows = each_shard(lambda: db.session.execute(
+        select(
+            User.updated_at,
+            select(func.max(Vehicle.updated_at)).where(Vehicle.user_id == user_id).scalar_subquery(),
+            select(func.count(Vehicle.id)).where(Vehicle.user_id == user_id).scalar_subquery(),
+            select(func.max(Reservation.id)).where(Reservation.user_id == user_id).scalar_subquery(),
+            select(func.max(ParkingLot.updated_at)).scalar_subquery(),
+        ).where(User.id == user_id)
+    ).first())
+    row = rows[0]
+    if row is None:
+        return None
+    return page_etag(*row, *(shard[3] for shard in rows[1:])), latest(row[0], row[1], row[4])
+
+
+def history_validator():
+    """
+    History: the user's reservations, and the lots and vehicles they show.
+    Not validated while one of them is active, since the page then shows
+    its running duration and cost as of now.
+    """
+    user_id = session['user_id']
+    rows = each_shard(lambda: db.session.execute(
+        select(
+            select(func.count(Reservation.id)).where(Reservation.user_id == user_id).scalar_subquery(),
+            select(func.max(Reservation.parking_timestamp)).where(Reservation.user_id == user_id).scalar_subquery(),
+            select(func.max(Reservation.leaving_timestamp)).where(Reservation.user_id == user_id).scalar_subquery(),
+            select(func.max(Vehicle.updated_at)).where(Vehicle.user_id == user_id).scalar_subquery(),
+            select(func.count(Vehicle.id)).where(Vehicle.user_id == user_id).scalar_subquery(),
+            select(func.max(ParkingLot.updated_at)).scalar_subquery(),
+            select(func.count(Reservation.id)).where(Reservation.user_id == user_id, Reservation.status == 'A').scalar_subquery(),
+        )
+    ).first())
+    if any(shard[6] for shard in rows):
+        return None
+
+    # Vehicles and lots read the same on every shard; reservations do not.
+    reservations, row = [shard[:3] for shard in rows], rows[0]
+    timestamps = [timestamp for _, parked_at, left_at in reservations for timestamp in (parked_at, left_at)]
+    return page_etag(*reservations, *row[3:6]), latest(*timestamps, row[3], row[5])
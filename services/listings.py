@@ -0,0 +1,74 @@
+from flask import current_app, request
+from collections import namedtuple
+from sqlalchemy.orm import joinedload
+from models import ParkingLot
+from .pagination import paginate, parse_page_size, Page
+from .search import search_lots, lot_search
+from .cache import StatsCache
+
+
+# Plain snapshots of a lot and its address, safe to share between requests
+# and threads, unlike ORM instances bound to the session that loaded them.
+LotAddress = namedtuple('LotAddress', 'house_number address city state country pincode')
+LotListing = namedtuple('LotListing', 'id prime_location_name price_per_hour max_spots address')
+
+
+def snapshot(lot):
+    address = lot.address
+    return LotListing(
+        lot.id,
+        lot.prime_location_name,
+        lot.price_per_hour,
+        lot.max_spots,
+        LotAddress(address.house_number, address.address, address.city, address.state, address.country, address.pincode),
+    )
+
+
+# --------------------------
+# Lot Listing Cache
+# --------------------------
+def lot_cache():
+    """
+    The app's listing cache, created from LOT_CACHE_SIZE / LOT_CACHE_TTL on
+    first use. Lot edits in this process clear it; the TTL bounds how long
+    other processes' edits take to show up.
+    """
+    cache = current_app.extensions.get('lot_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('lot_cache', StatsCache(
+            maxsize=current_app.config.get('LOT_CACHE_SIZE', 256),
+            ttl=current_app.config.get('LOT_CACHE_TTL', 60),
+        ))
+    return cache
+
+
+def invalidate_lots():
+    """Drops every cached lot listing. Call after a lot is added, edited or deleted."""
+    lot_cache().clear()
+
+
+# --------------------------
+# Cached Queries
+# --------------------------
+def lot_page(text=''):
+    """
+    The page of lots the lot lists show for this request, optionally
+    narrowed by a search, as LotListing snapshots. Pages are cached per
+    search text, cursor and page size.
+    """
+    key = (
+        text,
+        request.args.get('after'),
+        request.args.get('before'),
+        parse_page_size(request.args.get('per_page')),
+    )
+
+    def load():
+        lots = ParkingLot.query.options(joinedload(ParkingLot.address))
+        if text:
+            page = paginate(search_lots(lots, text), [lot_search.c.rank, ParkingLot.id])
+        else:
+            page = paginate(lots, [ParkingLot.id])
+        return Page([snapshot(lot) for lot in page.items], page.per_page, page.next_cursor, page.prev_cursor)
+
+    return lot_cache().get(key, load)
@@ -0,0 +1,192 @@
+from flask import current_app, g, request, has_app_context, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+# --------------------------
+# Prometheus Metrics
+# --------------------------
+# Kept per process: with several workers, each one's /metrics reports its
+# own requests, and Prometheus sums them across scrape targets.
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{format_labels(self.labels, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # labels -> ([count per bucket, then +Inf], sum)
+        self._lock = Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+
+        names = self.labels + ('le',)
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_labels(names, labels + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labels, labels)} {total}')
+            lines.append(f'{self.name}_count{format_labels(self.labels, labels)} {cumulative}')
+        return lines
+
+
+REQUESTS = Counter('parkedin_requests_total', 'Requests served.', ('endpoint', 'method', 'status'))
+LATENCY = Histogram('parkedin_request_duration_seconds', 'Time to build each response.', ('endpoint', 'method'))
+SQL_STATEMENTS = Histogram('parkedin_request_sql_statements', 'SQL statements run per request.', ('endpoint',), STATEMENT_BUCKETS)
+SQL_TIME = Counter('parkedin_sql_duration_seconds_total', 'Time spent running SQL.', ('endpoint',))
+RENDER_TIME = Counter('parkedin_template_render_seconds_total', 'Time spent rendering templates.', ('endpoint',))
+RESPONSE_SIZE = Histogram('parkedin_response_size_bytes', 'Size of each response body as sent.', ('endpoint',), SIZE_BUCKETS)
+
+METRICS = (REQUESTS, LATENCY, SQL_STATEMENTS, SQL_TIME, RENDER_TIME, RESPONSE_SIZE)
+
+
+def render_metrics():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --------------------------
+# Request Timings
+# --------------------------
+class RequestTimings:
+    """What one request spent its time on, collected in `g.timings`."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+
+    def server_timing(self, elapsed):
+        return ', '.join((
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} statements"',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ))
+
+
+def current_timings():
+    return g.get('timings') if has_app_context() else None
+
+
+def start_request():
+    g.timings = RequestTimings()
+
+
+def finish_request(response):
+    timings = g.pop('timings', None)
+    if timings is None:
+        return response
+
+    elapsed = perf_counter() - timings.started
+    endpoint = request.endpoint or 'unmatched'
+
+    REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+    LATENCY.observe((endpoint, request.method), elapsed)
+    SQL_STATEMENTS.observe((endpoint,), timings.sql_count)
+    SQL_TIME.inc((endpoint,), timings.sql_time)
+    RENDER_TIME.inc((endpoint,), timings.render_time)
+    # Streamed bodies such as the event stream have no size up front.
+    if not response.is_streamed:
+        RESPONSE_SIZE.observe((endpoint,), response.calculate_content_length() or 0)
+
+    if current_app.config.get('SERVER_TIMING'):
+        response.headers['Server-Timing'] = timings.server_timing(elapsed)
+    return response
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timings() is not None:
+        context.metrics_started = perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current_timings()
+    started = getattr(context, 'metrics_started', None)
+    if timings is not None and started is not None:
+        timings.sql_count += 1
+        timings.sql_time += perf_counter() - started
+
+
+def template_started(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None:
+        timings.render_started = perf_counter()
+
+
+def template_finished(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None and timings.render_started is not None:
+        timings.render_time += perf_counter() - timings.render_started
+        timings.render_started = None
+
+
+def init_metrics(app):
+    """
+    Times every request of `app`, with the SQL and template rendering it
+    did. Register it before the other after_request hooks so the response
+    size is measured after compression.
+    """
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    before_render_template.connect(template_started, app)
+    template_rendered.connect(template_finished, app)
+
+    # Listening on the Engine class covers every engine the app creates.
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
@@ -0,0 +1,294 @@
+from flask import current_app
+from models import db, ParkingLot, ParkingSpot
+from sqlalchemy import select, func, case
+from array import array
+from collections import namedtuple
+from threading import RLock
+from time import monotonic
+from .provisioning import spot_index, spot_number
+from .events import occupancy_events
+from .sharding import each_shard, on_shard, shard_count, shard_of_lot
+
+
+AVAILABLE = ord('A')
+OCCUPIED = ord('O')
+
+# Spot positions served per request by the spots endpoint, by default and at most.
+SPOT_WINDOW = 200
+MAX_SPOT_WINDOW = 1000
+
+# What a grid cell renders as; quacks like the ParkingSpot columns templates use.
+SpotCell = namedtuple('SpotCell', 'id spot_number status')
+
+
+# --------------------------
+# Per-lot Occupancy Grid
+# --------------------------
+class LotGrid:
+    """
+    The spots of one lot, indexed by their position in the lot (the n of
+    'LOT<lot>-S<n>'): `status` holds one byte per position ('A', 'O', or 0
+    for no spot) and `ids` the matching spot ids. A 10,000 spot lot takes
+    about 90 KB instead of 10,000 ORM objects.
+
+    `version` is what the database held when the grid was loaded: spot
+    count, available count and last spot update (see _spot_versions()).
+    """
+
+    def __init__(self, lot_id, rows=()):
+        self.lot_id = lot_id
+        self.status = bytearray(1)
+        self.ids = array('q', [0])
+        last_update = None
+        for spot_id, n, status, updated_at in rows:
+            self._grow(n)
+            self.ids[n] = spot_id
+            self.status[n] = ord(status)
+            if updated_at is not None and (last_update is None or updated_at > last_update):
+                last_update = updated_at
+        self.version = (self.total, self.available, last_update)
+        self.checked_at = monotonic()
+
+    def _grow(self, n):
+        missing = n + 1 - len(self.status)
+        if missing > 0:
+            self.status.extend(bytes(missing))
+            self.ids.extend([0] * missing)
+
+    def mark(self, n, status):
+        if 0 < n < len(self.status) and self.status[n]:
+            self.status[n] = ord(status)
+
+    @property
+    def available(self):
+        return self.status.count(AVAILABLE)
+
+    @property
+    def occupied(self):
+        return self.status.count(OCCUPIED)
+
+    @property
+    def total(self):
+        return len(self.status) - self.status.count(0)
+
+    @property
+    def size(self):
+        """Highest spot position in the lot."""
+        return len(self.status) - 1
+
+    def window(self, start=1, count=SPOT_WINDOW):
+        """
+        The spots at positions start..start+count-1, compactly: one status
+        character per position ('A', 'O', or '-' where there is no spot) and
+        the matching spot ids (0 where there is no spot).
+        """
+        start = max(start, 1)
+        end = min(start + max(count, 0), len(self.status))
+        return {
+            'lot_id': self.lot_id,
+            'start': start,
+            'size': self.size,
+            'statuses': self.status[start:end].replace(b'\0', b'-').decode('ascii'),
+            'ids': self.ids[start:end].tolist(),
+        }
+
+    def counts(self):
+        available, occupied = self.available, self.occupied
+        return {'available': available, 'occupied': occupied, 'total': available + occupied}
+
+    def event(self, delta, **changes):
+        """An occupancy event: the lot's counts, the change in available spots and what changed."""
+        return {'lot_id': self.lot_id, **self.counts(), 'delta': delta, **changes}
+
+    def __iter__(self):
+        """Yields a SpotCell per spot in position order."""
+        for n, status in enumerate(self.status):
+            if status:
+                yield SpotCell(self.ids[n], spot_number(self.lot_id, n), chr(status))
+
+
+# Grids are per process and built lazily; bookings, releases and lot edits
+# made through this process keep them current. Changes made by other
+# processes (other gunicorn workers, the CLI) are picked up by comparing a
+# grid's version with the database at most every OCCUPANCY_TTL seconds and
+# reloading it when they differ. The database stays the source of truth:
+# bookings still claim spots with conditional UPDATEs.
+#
+# The lock only guards the dict and the byte flips, never a query: a thread
+# waiting on it may be holding a database read lock that the thread inside
+# needs to be released.
+_grids = {}
+_grids_lock = RLock()
+
+
+def _spot_rows(lot_ids):
+    query = select(ParkingSpot.lot_id, ParkingSpot.id, spot_index, ParkingSpot.status, ParkingSpot.updated_at)
+    if lot_ids is not None:
+        query = query.where(ParkingSpot.lot_id.in_(lot_ids))
+    return db.session.execute(query).all()
+
+
+def _spot_versions(lot_ids):
+    """
+    The current version of each lot, as LotGrid.version has it. Every
+    booking and release bumps the last update, and adding or removing spots
+    changes the count, so a grid whose version still matches is current.
+    """
+    query = (
+        select(
+            ParkingSpot.lot_id,
+            func.count(),
+            func.coalesce(func.sum(case((ParkingSpot.status == 'A', 1), else_=0)), 0),
+            func.max(ParkingSpot.updated_at),
+        )
+        .where(ParkingSpot.lot_id.in_(lot_ids))
+        .group_by(ParkingSpot.lot_id)
+    )
+    return [(lot_id, tuple(version)) for lot_id, *version in db.session.execute(query)]
+
+
+def _by_shard(lot_ids, fetch):
+    """fetch(lot_ids) run once per shard the lots are on; the results chained."""
+    if lot_ids is None:
+        results = each_shard(lambda: fetch(None))
+    elif shard_count() < 2:
+        results = [fetch(lot_ids)]
+    else:
+        by_shard = {}
+        for lot_id in lot_ids:
+            by_shard.setdefault(shard_of_lot(lot_id), []).append(lot_id)
+        results = []
+        for shard, shard_lot_ids in by_shard.items():
+            with on_shard(shard):
+                results.append(fetch(shard_lot_ids))
+    return [row for result in results for row in result]
+
+
+def _load_grids(lot_ids):
+    rows = {}
+    for lot_id, spot_id, n, status, updated_at in _by_shard(lot_ids, _spot_rows):
+        rows.setdefault(lot_id, []).append((spot_id, n, status, updated_at))
+    return {lot_id: LotGrid(lot_id, rows.get(lot_id, ())) for lot_id in (lot_ids or rows)}
+
+
+def _stale_grids(lot_ids):
+    """
+    Of the loaded grids of `lot_ids` not checked for OCCUPANCY_TTL seconds,
+    marks the ones the database still agrees with as checked and returns
+    the others, which another process has changed.
+    """
+    ttl = current_app.config.get('OCCUPANCY_TTL', 1)
+    now = monotonic()
+    with _grids_lock:
+        due = [lot_id for lot_id in lot_ids if lot_id in _grids and now - _grids[lot_id].checked_at >= ttl]
+    if not due:
+        return {}
+
+    versions = dict(_by_shard(due, _spot_versions))
+    stale = {}
+    with _grids_lock:
+        for lot_id in due:
+            grid = _grids.get(lot_id)
+            if grid is None:
+                continue
+            if versions.get(lot_id, (0, 0, None)) == grid.version:
+                grid.checked_at = now
+            else:
+                stale[lot_id] = grid
+    return stale
+
+
+def get_lot_grids(lot_ids):
+    """
+    Returns {lot_id: LotGrid}, loading the missing ones and reloading the
+    ones another process changed, in a single query.
+    """
+    lot_ids = list(lot_ids)
+    stale = _stale_grids(lot_ids)
+    with _grids_lock:
+        missing = [lot_id for lot_id in lot_ids if lot_id not in _grids]
+
+    # A grid another thread installed meanwhile wins: every change committed
+    # after it was read has been, or is about to be, marked on it.
+    loaded = _load_grids(missing + list(stale)) if missing or stale else {}
+    events = []
+    with _grids_lock:
+        for lot_id, grid in loaded.items():
+            old = stale.get(lot_id)
+            if old is None or _grids.get(lot_id) is not old:
+                _grids.setdefault(lot_id, grid)
+            elif old.status == grid.status and old.ids == grid.ids:
+                # Only this process's own changes, already marked.
+                old.version, old.checked_at = grid.version, grid.checked_at
+            else:
+                _grids[lot_id] = grid
+                events.append(grid.event(grid.available - old.available))
+        grids = {lot_id: _grids[lot_id] for lot_id in lot_ids if lot_id in _grids}
+    for event in events:
+        occupancy_events.publish(event)
+
+    # Lots whose grid a concurrent edit dropped while this one was loading.
+    dropped = [lot_id for lot_id in lot_ids if lot_id not in grids]
+    if dropped:
+        grids.update(get_lot_grids(dropped))
+    return grids
+
+
+def get_lot_grid(lot_id):
+    return get_lot_grids([lot_id])[lot_id]
+
+
+def rebuild_lot_grids():
+    """Reloads the grid of every lot. Grids otherwise load lazily, lot by lot, on first use."""
+    grids = _load_grids(None)
+    with _grids_lock:
+        _grids.clear()
+        _grids.update(grids)
+    return len(grids)
+
+
+def mark_spot(lot_id, number, status):
+    """
+    Records a committed status change of the spot with spot_number `number`
+    and publishes it to occupancy subscribers.
+    """
+    n = int(number.rpartition('-S')[2])
+    # The change is marked rather than checked for: checking right after the
+    # commit would find the grid stale and reload it for nothing.
+    with _grids_lock:
+        grid = _grids.get(lot_id)
+    if grid is None:
+        grid = get_lot_grid(lot_id)
+    with _grids_lock:
+        grid.mark(n, status)
+        event = grid.event(1 if status == 'A' else -1, spot_id=grid.ids[n], status=status)
+    occupancy_events.publish(event)
+
+
+def refresh_lot_grid(lot_id):
+    """Reloads a lot's grid after its spots changed in bulk and publishes the new counts."""
+    with _grids_lock:
+        old = _grids.pop(lot_id, None)
+    grid = get_lot_grid(lot_id)
+    occupancy_events.publish(grid.event(grid.available - (old.available if old else 0)))
+
+
+def drop_lot_grid(lot_id):
+    """Forgets a deleted lot's grid and tells subscribers it is gone."""
+    with _grids_lock:
+        _grids.pop(lot_id, None)
+    occupancy_events.publish({'lot_id': lot_id, 'available': 0, 'occupied': 0, 'total': 0, 'delta': None, 'removed': True})
+
+
+# --------------------------
+# Lot Occupancy Summary
+# --------------------------
+def get_lot_occupancy(lot_ids=None):
+    """
+    Returns {lot_id: {'available': int, 'occupied': int, 'total': int}},
+    counted from the lots' occupancy grids, so callers never have to load
+    ParkingSpot rows just to count them.
+    """
+    if lot_ids is None:
+        lot_ids = db.session.scalars(select(ParkingLot.id))
+    return {lot_id: grid.counts() for lot_id, grid in get_lot_grids(lot_ids).items()}
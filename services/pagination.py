@@ -0,0 +1,126 @@
+from flask import request, url_for, current_app
+from sqlalchemy import tuple_
+from datetime import datetime
+from .sharding import gather, is_sharded
+import base64
+import json
+
+
+# Page sizes a client may ask for with ?per_page=.
+PAGE_SIZES = (10, 20, 50, 100)
+
+
+# --------------------------
+# Cursors
+# --------------------------
+def encode_cursor(values):
+    """Packs a row's sort key into an opaque, URL-safe cursor."""
+    packed = [['d', v.isoformat()] if isinstance(v, datetime) else ['v', v] for v in values]
+    return base64.urlsafe_b64encode(json.dumps(packed).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """
+    Inverse of encode_cursor(). Returns None for a missing or tampered
+    cursor, including one that is not a list of `size` plain values.
+    """
+    if not cursor:
+        return None
+    try:
+        packed = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(packed, list) or len(packed) != size:
+            return None
+        values = []
+        for entry in packed:
+            kind, value = entry if isinstance(entry, list) else (None, None)
+            if kind == 'd' and isinstance(value, str):
+                values.append(datetime.fromisoformat(value))
+            elif kind == 'v' and (value is None or isinstance(value, (str, int, float))):
+                values.append(value)
+            else:
+                return None
+        return values
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_page_size(value):
+    default = current_app.config.get('PAGE_SIZE', 20)
+    try:
+        per_page = int(value)
+    except (TypeError, ValueError):
+        return default
+    return per_page if per_page in PAGE_SIZES else default
+
+
+# --------------------------
+# Keyset Pagination
+# --------------------------
+class Page:
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def _url(self, **cursor):
+        args = request.args.to_dict()
+        args.pop('after', None)
+        args.pop('before', None)
+        args.update(cursor)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def next_url(self):
+        return self._url(after=self.next_cursor) if self.next_cursor else None
+
+    @property
+    def prev_url(self):
+        return self._url(before=self.prev_cursor) if self.prev_cursor else None
+
+
+def paginate(query, keys, descending=False):
+    """
+    Returns one Page of `query` ordered by `keys`, a list of column
+    expressions that together are unique (end with the primary key).
+
+    The position comes from the request's ?after= / ?before= cursor and the
+    size from ?per_page=. Each page is fetched with a row-value comparison
+    on `keys` and a LIMIT, so its cost does not depend on how deep into the
+    table it is, unlike OFFSET. Spots and reservations are fetched that way
+    from every shard and merged.
+    """
+    per_page = parse_page_size(request.args.get('per_page'))
+    after = decode_cursor(request.args.get('after'), len(keys))
+    before = decode_cursor(request.args.get('before'), len(keys))
+
+    position = tuple_(*keys)
+    backwards = before is not None and after is None
+
+    if backwards:
+        query = query.filter(position > tuple_(*before) if descending else position < tuple_(*before))
+    elif after is not None:
+        query = query.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+
+    # Walking backwards reads the rows in reverse order, then flips them.
+    reverse = descending != backwards
+    order = [key.desc() if reverse else key.asc() for key in keys]
+
+    page_query = query.add_columns(*keys).order_by(None).order_by(*order).limit(per_page + 1)
+    if is_sharded(query.column_descriptions[0]['entity']):
+        rows = gather(page_query.all, key=lambda row: tuple(row[1:]), reverse=reverse, limit=per_page + 1)
+    else:
+        rows = page_query.all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    items = [row[0] for row in rows]
+    if not rows:
+        return Page(items, per_page)
+
+    first, last = encode_cursor(rows[0][1:]), encode_cursor(rows[-1][1:])
+    if backwards:
+        return Page(items, per_page, next_cursor=last, prev_cursor=first if has_more else None)
+    return Page(items, per_page, next_cursor=last if has_more else None, prev_cursor=first if after is not None else None)
@@ -0,0 +1,114 @@
+from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, get_native_id
+import os
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Every hashing worker is busy and the queue is full; try again shortly."""
+
+
+# --------------------------
+# Password Hashing
+# --------------------------
+def lower_priority(nice):
+    """Thread initializer that renices the calling thread (Linux schedules threads one by one)."""
+    def initializer():
+        try:
+            os.setpriority(os.PRIO_PROCESS, get_native_id(), nice)
+        except (AttributeError, OSError):
+            pass
+    return initializer
+
+
+def full_method(method):
+    """
+    The method prefix werkzeug writes into a hash made with `method`, with
+    its default costs filled in: 'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' ->
+    'pbkdf2:sha256:<DEFAULT_PBKDF2_ITERATIONS>'. Other methods are returned
+    as they are.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return f'scrypt:{2 ** 15}:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    """
+    Hashes and checks passwords on `workers` threads of its own, so however
+    many requests log in at once, at most that many cores are busy hashing
+    and the rest stay free for bookings. hashlib releases the GIL while it
+    hashes, so the workers do run in parallel; they run at `nice`, so when
+    the cores are all busy anyway, request threads go first. Up to `queue`
+    more calls wait their turn; past that, hash() and verify() raise
+    HashingBusy straight away rather than holding a request thread.
+    """
+
+    def __init__(self, method, workers, queue, nice=0):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hash', initializer=lower_priority(nice),
+        )
+        self._slots = BoundedSemaphore(workers + queue)
+        # Stored hashes carry the full form, so compare against that.
+        self.method = full_method(method)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with another method or cost than the configured one."""
+        return password_hash.partition('$')[0] != self.method
+
+
+def password_hasher():
+    """The app's hasher, created from PASSWORD_HASH_METHOD / _WORKERS / _QUEUE / _NICE on first use."""
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is None:
+        hasher = current_app.extensions.setdefault('password_hasher', PasswordHasher(
+            method=current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            workers=current_app.config.get('PASSWORD_HASH_WORKERS', 2),
+            queue=current_app.config.get('PASSWORD_HASH_QUEUE', 16),
+            nice=current_app.config.get('PASSWORD_HASH_NICE', 0),
+        ))
+    return hasher
+
+
+def hash_password(password):
+    return password_hasher().hash(password)
+
+
+def verify_password(user, password):
+    """
+    Checks `password` against the user's stored hash. When it matches but
+    was hashed with an older method or cost, stores a fresh hash in the
+    session for the caller to commit; if the workers are too busy for
+    that, it is left for the next login.
+    """
+    hasher = password_hasher()
+    if not hasher.verify(user.password, password):
+        return False
+
+    if hasher.needs_rehash(user.password):
+        try:
+            user.password = hasher.hash(password)
+        except HashingBusy:
+            pass
+    return True
@@ -0,0 +1,133 @@
+from flask import current_app, g, request, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter
+from itertools import count
+from threading import Thread, Event, get_ident
+from time import perf_counter, strftime
+import logging
+import os
+import sys
+
+
+slow_query_log = logging.getLogger('parkedin.slow_queries')
+
+# Longest parameter list written to the slow-query log, in characters.
+MAX_LOGGED_PARAMS = 500
+
+
+# --------------------------
+# Slow Query Log
+# --------------------------
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.slow_query_started = perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_app_context():
+        return
+    threshold = current_app.config.get('SLOW_QUERY_MS')
+    started = getattr(context, 'slow_query_started', None)
+    if not threshold or started is None:
+        return
+
+    elapsed = (perf_counter() - started) * 1000
+    if elapsed < threshold:
+        return
+
+    route = f'{request.method} {request.full_path} ({request.endpoint})' if has_request_context() else 'outside a request'
+    params = repr(parameters)
+    if len(params) > MAX_LOGGED_PARAMS:
+        params = params[:MAX_LOGGED_PARAMS] + '...'
+    slow_query_log.warning(
+        '%.1f ms %s\n%s\nparams%s: %s',
+        elapsed, route, statement, ' (executemany)' if executemany else '', params,
+    )
+
+
+# --------------------------
+# Sampling Profiler
+# --------------------------
+class StackSampler(Thread):
+    """
+    Samples one thread's Python stack every `interval` seconds until
+    stopped, counting identical stacks. The counts are written in the
+    collapsed format flamegraph.pl, speedscope and inferno read.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, 'w') as output:
+            for stack, samples in self.stacks.most_common():
+                output.write(f'{stack} {samples}\n')
+
+
+_request_numbers = count(1)
+
+
+def start_sampling():
+    rate = current_app.config.get('PROFILE_SAMPLE_RATE')
+    if not rate:
+        return
+    number = next(_request_numbers)
+    if number % rate:
+        return
+    g.profiled_request = number
+    g.sampler = StackSampler(get_ident(), current_app.config.get('PROFILE_INTERVAL_MS', 1) / 1000)
+    g.sampler.start()
+
+
+def finish_sampling(exception=None):
+    sampler = g.pop('sampler', None)
+    if sampler is None:
+        return
+    sampler.stop()
+
+    directory = current_app.config.get('PROFILE_DIR') or os.path.join(current_app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    name = f"{strftime('%Y%m%d-%H%M%S')}-{g.profiled_request}-{request.endpoint or 'unmatched'}.folded"
+    sampler.write(os.path.join(directory, name))
+
+
+def init_profiling(app):
+    """
+    Hooks up the slow-query log (SLOW_QUERY_MS, written to SLOW_QUERY_LOG
+    when set) and the 1-in-PROFILE_SAMPLE_RATE request profiler. Both read
+    the config on every use, so either can be switched at runtime.
+    """
+    app.before_request(start_sampling)
+    app.teardown_request(finish_sampling)
+
+    # The logger is shared by every app in the process; one handler per file.
+    path = app.config.get('SLOW_QUERY_LOG')
+    if path and not any(
+        getattr(handler, 'baseFilename', None) == os.path.abspath(path) for handler in slow_query_log.handlers
+    ):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_log.addHandler(handler)
+
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
@@ -0,0 +1,90 @@
+from models import db, ParkingSpot, Reservation
+from sqlalchemy import func, cast, select, Integer
+from datetime import datetime
+from .rollup import record_removal
+
+
+# A spot's position in its lot, read back out of its 'LOT<lot>-S<n>' number.
+spot_index = cast(
+    func.substr(ParkingSpot.spot_number, func.instr(ParkingSpot.spot_number, '-S') + 2),
+    Integer
+)
+
+
+def spot_number(lot_id, n):
+    return f"LOT{lot_id}-S{n:03d}"
+
+
+# --------------------------
+# Bulk Spot Changes
+# --------------------------
+def add_spots(lot_id, numbers):
+    """
+    Inserts an available spot for each position in `numbers` with a single
+    executemany. Returns how many were added. Does not commit.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {'lot_id': lot_id, 'spot_number': spot_number(lot_id, n), 'status': 'A', 'created_at': now, 'updated_at': now}
+        for n in numbers
+    ]
+    if rows:
+        db.session.execute(ParkingSpot.__table__.insert(), rows)
+    return len(rows)
+
+
+def remove_spots_above(lot_id, max_spots):
+    """
+    Deletes the available spots of a lot numbered above `max_spots`, with
+    their past reservations, in two set-based DELETEs, and takes those
+    reservations out of the lot's daily rollup. Returns the spot
+    numbers that are still above it because they are occupied. Does not
+    commit.
+    """
+    doomed = select(ParkingSpot.id).where(
+        ParkingSpot.lot_id == lot_id,
+        ParkingSpot.status == 'A',
+        spot_index > max_spots
+    )
+
+    record_removal(lot_id, doomed)
+    Reservation.query.filter(Reservation.spot_id.in_(doomed)).delete(synchronize_session=False)
+    ParkingSpot.query.filter(ParkingSpot.id.in_(doomed)).delete(synchronize_session=False)
+
+    return db.session.scalars(
+        select(ParkingSpot.spot_number)
+        .where(ParkingSpot.lot_id == lot_id, spot_index > max_spots)
+        .order_by(spot_index)
+    ).all()
+
+
+# --------------------------
+# Lot Provisioning
+# --------------------------
+def provision_lot(lot):
+    """Flushes a new lot and creates its spots 1..max_spots. Does not commit."""
+    db.session.flush()
+    add_spots(lot.id, range(1, lot.max_spots + 1))
+
+
+def resize_lot(lot, max_spots):
+    """
+    Grows or shrinks a lot to `max_spots` spots inside the current
+    transaction. Occupied spots are never removed; their numbers are
+    returned so the caller can report them. Does not commit.
+    """
+    old_max_spots = lot.max_spots
+    kept = []
+
+    if max_spots > old_max_spots:
+        # Occupied spots left over from an earlier shrink keep their numbers.
+        existing = set(db.session.scalars(
+            select(spot_index).where(ParkingSpot.lot_id == lot.id, spot_index > old_max_spots)
+        ))
+        add_spots(lot.id, (n for n in range(old_max_spots + 1, max_spots + 1) if n not in existing))
+
+    elif max_spots < old_max_spots:
+        kept = remove_spots_above(lot.id, max_spots)
+
+    lot.max_spots = max_spots
+    return kept
@@ -0,0 +1,56 @@
+from flask import current_app, request, session
+from sqlalchemy.engine import make_url
+from time import time
+from models import REPLICA
+from .sqlite_tuning import is_file_sqlite
+
+
+def replica_uri(app):
+    """
+    DB_REPLICA_URI when set; otherwise, for a file-backed SQLite database,
+    a read-only (mode=ro) connection to the same file, which under WAL
+    reads alongside the writers without ever taking a write lock.
+    """
+    if app.config.get('DB_REPLICA_URI'):
+        return app.config['DB_REPLICA_URI']
+
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not is_file_sqlite(uri):
+        return None
+    url = make_url(uri)
+    return url.set(database=f'file:{url.database}', query={**url.query, 'mode': 'ro', 'uri': 'true'}).render_as_string()
+
+
+# --------------------------
+# Read/Write Routing
+# --------------------------
+def configure_read_replica(app):
+    """
+    Adds the replica bind when DB_READ_ROUTING is on and there is something
+    to read from. Must run before db.init_app(app).
+    """
+    if not app.config.get('DB_READ_ROUTING'):
+        return
+    uri = replica_uri(app)
+    if uri:
+        app.config['SQLALCHEMY_BINDS'] = {**(app.config.get('SQLALCHEMY_BINDS') or {}), REPLICA: uri}
+
+
+def recently_wrote():
+    """Whether this client's last write is recent enough that a replica may not show it yet."""
+    return session.get('_primary_until', 0) > time()
+
+
+def remember_write(response):
+    """
+    After any request that may have written, pins the client's reads to the
+    primary for DB_READ_YOUR_WRITES seconds, so the page it is redirected
+    to shows its own change even on a lagging replica.
+    """
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        session['_primary_until'] = time() + current_app.config.get('DB_READ_YOUR_WRITES', 5)
+    return response
+
+
+def init_read_routing(app):
+    app.after_request(remember_write)
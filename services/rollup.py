@@ -0,0 +1,181 @@
+from models import db, ParkingSpot, Reservation, DailyLotStats
+from sqlalchemy import func, update, bindparam
+from sqlalchemy.dialects.sqlite import insert
+from .analytics import parse_day
+from .sharding import each_shard
+
+
+# --------------------------
+# Incremental Maintenance
+# --------------------------
+def _upsert(lot_id, day, reservation_count=0, revenue=0.0, occupied_hours=0.0, peak_occupancy=0):
+    table = DailyLotStats.__table__
+    stmt = insert(table).values(
+        lot_id=lot_id,
+        day=day,
+        reservation_count=reservation_count,
+        revenue=revenue,
+        occupied_hours=occupied_hours,
+        peak_occupancy=peak_occupancy,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.lot_id, table.c.day],
+        set_={
+            'reservation_count': table.c.reservation_count + stmt.excluded.reservation_count,
+            'revenue': table.c.revenue + stmt.excluded.revenue,
+            'occupied_hours': table.c.occupied_hours + stmt.excluded.occupied_hours,
+            'peak_occupancy': func.max(table.c.peak_occupancy, stmt.excluded.peak_occupancy),
+        }
+    )
+    db.session.execute(stmt)
+
+
+def record_booking(spot, parked_at):
+    """
+    Counts a new reservation against its lot and day. Must run in the booking
+    transaction after the spot was claimed, so the occupied count includes it.
+    """
+    occupied = ParkingSpot.query.filter_by(lot_id=spot.lot_id, status='O').count()
+    _upsert(spot.lot_id, parked_at.date(), reservation_count=1, peak_occupancy=occupied)
+
+
+def record_release(booking, left_at, cost):
+    """
+    Adds a released reservation's revenue and hours to the day it started on,
+    matching how the summaries bucket reservations by parking_timestamp.
+    """
+    hours = (left_at - booking.parking_timestamp).total_seconds() / 3600
+    _upsert(booking.spot.lot_id, booking.parking_timestamp.date(), revenue=cost, occupied_hours=hours)
+
+
+def record_removal(lot_id, spot_ids):
+    """
+    Takes the reservations of spots about to be deleted back out of their
+    lot's days, counted the way the backfill counts them, and drops days
+    left with none. Must run in the same transaction as the delete, before
+    it. peak_occupancy stays as it was: it is a high-water mark.
+    """
+    day = func.date(Reservation.parking_timestamp)
+    hours = (func.julianday(Reservation.leaving_timestamp) - func.julianday(Reservation.parking_timestamp)) * 24
+    rows = (
+        db.session.query(
+            day,
+            func.count(Reservation.id),
+            func.coalesce(func.sum(Reservation.parking_cost), 0),
+            func.coalesce(func.sum(hours), 0),
+        )
+        .filter(Reservation.spot_id.in_(spot_ids), Reservation.parking_timestamp.is_not(None))
+        .group_by(day)
+        .all()
+    )
+    if not rows:
+        return
+
+    table = DailyLotStats.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.lot_id == lot_id, table.c.day == bindparam('removed_day'))
+        .values(
+            reservation_count=table.c.reservation_count - bindparam('removed_count'),
+            revenue=table.c.revenue - bindparam('removed_revenue'),
+            occupied_hours=table.c.occupied_hours - bindparam('removed_hours'),
+        ),
+        [
+            {'removed_day': parse_day(d), 'removed_count': count,
+             'removed_revenue': float(revenue), 'removed_hours': float(occupied_hours)}
+            for d, count, revenue, occupied_hours in rows
+        ]
+    )
+    DailyLotStats.query.filter(
+        DailyLotStats.lot_id == lot_id, DailyLotStats.reservation_count <= 0
+    ).delete(synchronize_session=False)
+
+
+# --------------------------
+# Backfill
+# --------------------------
+def _peak_occupancy():
+    """
+    Sweeps every reservation's start/end in time order, per lot, and returns
+    {(lot_id, day): peak concurrent reservations}.
+    """
+    rows = (
+        db.session.query(ParkingSpot.lot_id, Reservation.parking_timestamp, Reservation.leaving_timestamp)
+        .join(ParkingSpot, Reservation.spot_id == ParkingSpot.id)
+        .filter(Reservation.parking_timestamp.is_not(None))
+        .yield_per(10000)
+    )
+
+    events = {}
+    for lot_id, parked_at, left_at in rows:
+        lot_events = events.setdefault(lot_id, [])
+        lot_events.append((parked_at, 1))
+        if left_at:
+            lot_events.append((left_at, -1))
+
+    peaks = {}
+    for lot_id, lot_events in events.items():
+        # Leaving sorts before arriving at the same instant.
+        lot_events.sort()
+        current = 0
+        for moment, delta in lot_events:
+            current += delta
+            if delta > 0:
+                key = (lot_id, moment.date())
+                peaks[key] = max(peaks.get(key, 0), current)
+    return peaks
+
+
+def backfill_daily_stats():
+    """Rebuilds DailyLotStats from the reservation table on every shard. Returns the row count."""
+    return sum(each_shard(_backfill_shard))
+
+
+def _backfill_shard():
+    day = func.date(Reservation.parking_timestamp)
+    hours = (func.julianday(Reservation.leaving_timestamp) - func.julianday(Reservation.parking_timestamp)) * 24
+
+    rows = (
+        db.session.query(
+            ParkingSpot.lot_id,
+            day,
+            func.count(Reservation.id),
+            func.coalesce(func.sum(Reservation.parking_cost), 0),
+            func.coalesce(func.sum(hours), 0),
+        )
+        .join(ParkingSpot, Reservation.spot_id == ParkingSpot.id)
+        .filter(Reservation.parking_timestamp.is_not(None))
+        .group_by(ParkingSpot.lot_id, day)
+        .all()
+    )
+
+    peaks = _peak_occupancy()
+
+    DailyLotStats.query.delete()
+    if rows:
+        db.session.execute(
+            DailyLotStats.__table__.insert(),
+            [
+                {
+                    'lot_id': lot_id,
+                    'day': parse_day(d),
+                    'reservation_count': count,
+                    'revenue': float(revenue),
+                    'occupied_hours': float(occupied_hours),
+                    'peak_occupancy': peaks.get((lot_id, parse_day(d)), 0),
+                }
+                for lot_id, d, count, revenue, occupied_hours in rows
+            ]
+        )
+    db.session.commit()
+
+    return len(rows)
+
+
+def backfill_if_empty():
+    """Fills the rollup on first start after upgrading an existing database."""
+    def needs_backfill():
+        return DailyLotStats.query.first() is None and Reservation.query.first() is not None
+
+    if any(each_shard(needs_backfill)):
+        backfill_daily_stats()
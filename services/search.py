@@ -0,0 +1,155 @@
+from models import db, User, ParkingLot
+from sqlalchemy import table, column, select, false
+import re
+
+
+# FTS5 indexes over the searchable text of lots, users and vehicles. They
+# are plain SQL objects rather than models, so create_all() never sees them;
+# triggers on the base tables keep them in sync with every insert, update
+# and delete, including bulk statements that bypass the ORM.
+lot_search = table('lot_search', column('rowid'), column('rank'), column('lot_search'))
+user_search = table('user_search', column('rowid'), column('rank'), column('user_search'))
+vehicle_search = table('vehicle_search', column('rowid'), column('rank'), column('vehicle_search'))
+
+
+SEARCH_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS lot_search USING fts5(name, address, city, state, pincode)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(full_name, email)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS vehicle_search USING fts5(vehicle_number, vehicle_type)",
+
+    # Lots are indexed together with their address.
+    """CREATE TRIGGER IF NOT EXISTS lot_search_ai AFTER INSERT ON parking_lot BEGIN
+        INSERT INTO lot_search(rowid, name, address, city, state, pincode)
+        SELECT new.id, new.prime_location_name, a.address, a.city, a.state, a.pincode
+        FROM address a WHERE a.id = new.address_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lot_search_au AFTER UPDATE OF prime_location_name, address_id ON parking_lot BEGIN
+        DELETE FROM lot_search WHERE rowid = old.id;
+        INSERT INTO lot_search(rowid, name, address, city, state, pincode)
+        SELECT new.id, new.prime_location_name, a.address, a.city, a.state, a.pincode
+        FROM address a WHERE a.id = new.address_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lot_search_ad AFTER DELETE ON parking_lot BEGIN
+        DELETE FROM lot_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS lot_search_address_au AFTER UPDATE OF address, city, state, pincode ON address BEGIN
+        DELETE FROM lot_search WHERE rowid IN (SELECT id FROM parking_lot WHERE address_id = new.id);
+        INSERT INTO lot_search(rowid, name, address, city, state, pincode)
+        SELECT p.id, p.prime_location_name, new.address, new.city, new.state, new.pincode
+        FROM parking_lot p WHERE p.address_id = new.id;
+    END""",
+
+    """CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON "user" BEGIN
+        INSERT INTO user_search(rowid, full_name, email) VALUES (new.id, new.full_name, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_search_au AFTER UPDATE OF full_name, email ON "user" BEGIN
+        DELETE FROM user_search WHERE rowid = old.id;
+        INSERT INTO user_search(rowid, full_name, email) VALUES (new.id, new.full_name, new.email);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON "user" BEGIN
+        DELETE FROM user_search WHERE rowid = old.id;
+    END""",
+
+    """CREATE TRIGGER IF NOT EXISTS vehicle_search_ai AFTER INSERT ON vehicle BEGIN
+        INSERT INTO vehicle_search(rowid, vehicle_number, vehicle_type) VALUES (new.id, new.vehicle_number, new.vehicle_type);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vehicle_search_au AFTER UPDATE OF vehicle_number, vehicle_type ON vehicle BEGIN
+        DELETE FROM vehicle_search WHERE rowid = old.id;
+        INSERT INTO vehicle_search(rowid, vehicle_number, vehicle_type) VALUES (new.id, new.vehicle_number, new.vehicle_type);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS vehicle_search_ad AFTER DELETE ON vehicle BEGIN
+        DELETE FROM vehicle_search WHERE rowid = old.id;
+    END""",
+]
+
+REBUILD_SEARCH = [
+    "DELETE FROM lot_search",
+    """INSERT INTO lot_search(rowid, name, address, city, state, pincode)
+       SELECT p.id, p.prime_location_name, a.address, a.city, a.state, a.pincode
+       FROM parking_lot p JOIN address a ON a.id = p.address_id""",
+    "DELETE FROM user_search",
+    'INSERT INTO user_search(rowid, full_name, email) SELECT id, full_name, email FROM "user"',
+    "DELETE FROM vehicle_search",
+    "INSERT INTO vehicle_search(rowid, vehicle_number, vehicle_type) SELECT id, vehicle_number, vehicle_type FROM vehicle",
+]
+
+
+# --------------------------
+# Index Maintenance
+# --------------------------
+def create_search_index():
+    """Creates the FTS5 tables and triggers, filling them if they were just created."""
+    existed = db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lot_search'")
+    ).first() is not None
+
+    for statement in SEARCH_SCHEMA:
+        db.session.execute(db.text(statement))
+
+    if not existed:
+        rebuild_search_index()
+    db.session.commit()
+
+
+def rebuild_search_index():
+    """Repopulates every search index from the base tables."""
+    for statement in REBUILD_SEARCH:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+
+
+# --------------------------
+# Queries
+# --------------------------
+def fts_query(text):
+    """
+    Turns free text into an FTS5 query that prefix-matches every word, e.g.
+    'mg road 5600' -> '"mg"* "road"* "5600"*'. Returns None if nothing is left.
+    """
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _matching_ids(index, text):
+    """Subquery of the rowids in `index` that prefix-match `text`."""
+    text = fts_query(text)
+    if text is None:
+        return select(index.c.rowid).where(false())
+    return select(index.c.rowid).where(index.c[index.name].match(text))
+
+
+def _ranked(query, index, key, text):
+    text = fts_query(text)
+    if text is None:
+        return query.filter(false())
+
+    return (
+        query
+        .join(index, index.c.rowid == key)
+        .filter(index.c[index.name].match(text))
+        .order_by(index.c.rank)
+    )
+
+
+def search_lots(query, text):
+    """Narrows a ParkingLot query to lots matching `text`, best match first."""
+    return _ranked(query, lot_search, ParkingLot.id, text)
+
+
+def search_users(query, text):
+    """Narrows a User query to users matching `text`, best match first."""
+    return _ranked(query, user_search, User.id, text)
+
+
+def matching_lot_ids(text):
+    return _matching_ids(lot_search, text)
+
+
+def matching_user_ids(text):
+    return _matching_ids(user_search, text)
+
+
+def matching_vehicle_ids(text):
+    return _matching_ids(vehicle_search, text)
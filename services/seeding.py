@@ -0,0 +1,214 @@
+from models import db, Address, User, Vehicle, ParkingLot, ParkingSpot, Reservation, LotShard
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
+from math import ceil
+import random
+from .provisioning import spot_number
+from .rollup import backfill_daily_stats
+from .sharding import shard_count, shard_for_region, shard_of_row, on_shard, gather
+
+
+# Rows per INSERT batch, so millions of reservations never sit in memory at once.
+BATCH_SIZE = 20000
+
+CITIES = (
+    ('Mumbai', 'Maharashtra', 'MH', 400000),
+    ('Pune', 'Maharashtra', 'MH', 411000),
+    ('Bengaluru', 'Karnataka', 'KA', 560000),
+    ('Chennai', 'Tamil Nadu', 'TN', 600000),
+    ('Delhi', 'Delhi', 'DL', 110000),
+    ('Hyderabad', 'Telangana', 'TS', 500000),
+    ('Kolkata', 'West Bengal', 'WB', 700000),
+    ('Ahmedabad', 'Gujarat', 'GJ', 380000),
+)
+AREAS = ('Central', 'Station Road', 'Market', 'Tech Park', 'City Mall', 'Airport', 'Hospital', 'Stadium', 'Old Town', 'Harbour')
+FIRST_NAMES = ('Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Rahul', 'Meera', 'Karan', 'Isha')
+LAST_NAMES = ('Sharma', 'Patel', 'Iyer', 'Reddy', 'Gupta', 'Singh', 'Nair', 'Das', 'Mehta', 'Rao', 'Joshi', 'Kulkarni')
+
+# Relative booking volume from Monday to Sunday, and by hour of the day:
+# commuter peaks on weekdays, a late-morning to evening hump at weekends.
+DAY_OF_WEEK_WEIGHTS = (1.0, 1.05, 1.05, 1.1, 1.25, 0.8, 0.6)
+WEEKDAY_HOUR_WEIGHTS = (1, 1, 1, 1, 2, 4, 10, 24, 30, 22, 12, 10, 12, 11, 10, 11, 16, 24, 22, 14, 9, 6, 3, 2)
+WEEKEND_HOUR_WEIGHTS = (1, 1, 1, 1, 1, 2, 3, 5, 8, 12, 16, 18, 18, 17, 16, 16, 15, 15, 14, 12, 9, 6, 3, 2)
+
+
+def _next_id(model):
+    return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def _by_shard(items, shard_of):
+    by_shard = {}
+    for item in items:
+        by_shard.setdefault(shard_of(item), []).append(item)
+    return by_shard.items()
+
+
+def _insert_sharded(table, rows, shard_of):
+    """Inserts each row on shard `shard_of(row)`."""
+    for shard, shard_rows in _by_shard(rows, shard_of):
+        with on_shard(shard):
+            _insert(table, shard_rows)
+
+
+def _spot_shard(row):
+    return shard_of_row(row['spot_id'])
+
+
+def _vehicle_number(state_code, n):
+    # Two digits, two letters and four digits after the state code, all
+    # derived from the vehicle id so numbers never repeat.
+    letters = chr(65 + n // 1000000 // 26 % 26) + chr(65 + n // 1000000 % 26)
+    return f'{state_code}{n // 10000 % 100:02d}{letters}{n % 10000:04d}'
+
+
+def _duration(rng, parked_at):
+    """Hours parked: a working day for weekday morning arrivals, a few hours otherwise."""
+    if parked_at.weekday() < 5 and 6 <= parked_at.hour <= 10:
+        return max(0.25, rng.gauss(8.5, 1.5))
+    return max(0.25, rng.lognormvariate(0.6, 0.6))
+
+
+# --------------------------
+# Synthetic Dataset
+# --------------------------
+def seed_synthetic(lots, spots, users, reservations, active=0.2, days=365, seed=None, password='password'):
+    """
+    Adds a realistic dataset next to whatever the database already holds:
+    `lots` lots of `spots` spots across a few cities, `users` users with one
+    to three vehicles each, and `reservations` released reservations over
+    the past `days` days following DAY_OF_WEEK_WEIGHTS and the hourly
+    profiles, with some lots and users far busier than others. A share
+    `active` of the new users is parked right now. Every new user logs in
+    with `password`. Lots go to the shard of their state. Rebuilds the
+    daily stats rollup and commits.
+    Returns the number of rows added per table.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    address_id = _next_id(Address)
+    first_lot_id, first_user_id = _next_id(ParkingLot), _next_id(User)
+    lot_ids = range(first_lot_id, first_lot_id + lots)
+    user_ids = range(first_user_id, first_user_id + users)
+    next_vehicle_id = _next_id(Vehicle)
+
+    addresses, lot_rows = [], []
+    for n, lot_id in enumerate(lot_ids):
+        city, state, _, pincode = rng.choice(CITIES)
+        area = AREAS[n % len(AREAS)]
+        addresses.append({'id': address_id, 'house_number': str(n + 1), 'address': f'{area}, Sector {n // len(AREAS) + 1}',
+                          'city': city, 'district': city, 'state': state, 'country': 'India', 'pincode': f'{pincode + n % 100:06d}'})
+        lot_rows.append({'id': lot_id, 'prime_location_name': f'{city} {area} Parking', 'address_id': address_id,
+                         'price_per_hour': float(rng.choice((20, 30, 40, 50, 60, 80, 100))), 'max_spots': spots,
+                         'created_at': now - timedelta(days=days), 'updated_at': now - timedelta(days=days)})
+        address_id += 1
+
+    password_hash = generate_password_hash(password)
+    user_rows, vehicle_rows, user_vehicles = [], [], {}
+    for user_id in user_ids:
+        city, state, state_code, pincode = rng.choice(CITIES)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        registered_at = now - timedelta(days=days, minutes=rng.randrange(60 * 24 * 90))
+        addresses.append({'id': address_id, 'house_number': str(rng.randint(1, 999)), 'address': f'{rng.choice(AREAS)} Lane',
+                          'city': city, 'district': city, 'state': state, 'country': 'India', 'pincode': f'{pincode + rng.randrange(100):06d}'})
+        user_rows.append({'id': user_id, 'email': f'{first}.{last}.{user_id}@example.com'.lower(), 'password': password_hash,
+                          'is_admin': False, 'full_name': f'{first} {last}', 'address_id': address_id,
+                          'registered_at': registered_at, 'updated_at': registered_at})
+        address_id += 1
+
+        user_vehicles[user_id] = []
+        for _ in range(rng.choices((1, 2, 3), (70, 25, 5))[0]):
+            vehicle_rows.append({'id': next_vehicle_id, 'user_id': user_id,
+                                 'vehicle_number': _vehicle_number(state_code, next_vehicle_id),
+                                 'vehicle_type': rng.choices(('Car', 'Bike'), (60, 40))[0], 'is_parked_in': False,
+                                 'added_at': registered_at, 'updated_at': registered_at})
+            user_vehicles[user_id].append(next_vehicle_id)
+            next_vehicle_id += 1
+
+    states = {row['id']: row['state'] for row in addresses}
+    lot_shards = {
+        row['id']: shard_for_region(states[row['address_id']]) if shard_count() > 1 else 0
+        for row in lot_rows
+    }
+
+    _insert(Address.__table__, addresses)
+    _insert(ParkingLot.__table__, lot_rows)
+    _insert(LotShard.__table__, [{'lot_id': lot_id, 'shard': shard} for lot_id, shard in lot_shards.items() if shard])
+    _insert(User.__table__, user_rows)
+    _insert(Vehicle.__table__, vehicle_rows)
+    _insert_sharded(ParkingSpot.__table__, [
+        {'lot_id': lot_id, 'spot_number': spot_number(lot_id, n), 'status': 'A',
+         'created_at': now - timedelta(days=days), 'updated_at': now - timedelta(days=days)}
+        for lot_id in lot_ids for n in range(1, spots + 1)
+    ], lambda row: lot_shards[row['lot_id']])
+
+    lot_spots = {lot_id: [] for lot_id in lot_ids}
+    for spot_id, lot_id in gather(
+        lambda: db.session.execute(
+            select(ParkingSpot.id, ParkingSpot.lot_id).where(ParkingSpot.lot_id.between(lot_ids.start, lot_ids.stop - 1))
+        ).all()
+    ):
+        lot_spots[lot_id].append(spot_id)
+    prices = {row['id']: row['price_per_hour'] for row in lot_rows}
+
+    # Long-tailed popularity: a few lots and a few regulars take most bookings.
+    lot_weights = [1 / (rank + 1) ** 0.8 for rank in range(lots)]
+    user_weights = [rng.paretovariate(1.5) for _ in range(users)]
+    past_days = [now.date() - timedelta(days=d) for d in range(1, days + 1)]
+    day_weights = [DAY_OF_WEEK_WEIGHTS[day.weekday()] for day in past_days]
+
+    added = 0
+    while added < reservations:
+        count = min(BATCH_SIZE, reservations - added)
+        rows = []
+        for day, lot_id, user_id in zip(
+            rng.choices(past_days, day_weights, k=count),
+            rng.choices(lot_ids, lot_weights, k=count),
+            rng.choices(user_ids, user_weights, k=count),
+        ):
+            hours = WEEKDAY_HOUR_WEIGHTS if day.weekday() < 5 else WEEKEND_HOUR_WEIGHTS
+            parked_at = datetime(day.year, day.month, day.day, rng.choices(range(24), hours)[0], rng.randrange(60))
+            left_at = parked_at + timedelta(hours=_duration(rng, parked_at))
+            rows.append({
+                'user_id': user_id, 'spot_id': rng.choice(lot_spots[lot_id]),
+                'vehicle_id': rng.choice(user_vehicles[user_id]), 'status': 'R',
+                'parking_timestamp': parked_at, 'leaving_timestamp': left_at,
+                'parking_cost': ceil((left_at - parked_at).total_seconds() / 3600) * prices[lot_id],
+            })
+        _insert_sharded(Reservation.__table__, rows, _spot_shard)
+        added += count
+
+    all_spots = [spot_id for spot_ids in lot_spots.values() for spot_id in spot_ids]
+    parked_users = rng.sample(user_ids, min(int(users * active), len(all_spots)))
+    parked_spots = rng.sample(all_spots, len(parked_users))
+    parked_vehicles = [rng.choice(user_vehicles[user_id]) for user_id in parked_users]
+    _insert_sharded(Reservation.__table__, [
+        {'user_id': user_id, 'spot_id': spot_id, 'vehicle_id': vehicle_id, 'status': 'A',
+         'parking_timestamp': now - timedelta(minutes=rng.randrange(5, 600)), 'leaving_timestamp': None, 'parking_cost': None}
+        for user_id, spot_id, vehicle_id in zip(parked_users, parked_spots, parked_vehicles)
+    ], _spot_shard)
+    for shard, spot_ids in _by_shard(parked_spots, shard_of_row):
+        with on_shard(shard):
+            for start in range(0, len(spot_ids), BATCH_SIZE):
+                batch = spot_ids[start:start + BATCH_SIZE]
+                ParkingSpot.query.filter(ParkingSpot.id.in_(batch)).update({'status': 'O'}, synchronize_session=False)
+    for start in range(0, len(parked_vehicles), BATCH_SIZE):
+        batch = parked_vehicles[start:start + BATCH_SIZE]
+        Vehicle.query.filter(Vehicle.id.in_(batch)).update({'is_parked_in': True}, synchronize_session=False)
+    db.session.commit()
+
+    backfill_daily_stats()
+
+    return {
+        'lots': lots,
+        'spots': len(all_spots),
+        'users': users,
+        'vehicles': len(vehicle_rows),
+        'reservations': reservations + len(parked_users),
+    }
@@ -0,0 +1,206 @@
+from flask import current_app, g
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import make_url
+from contextlib import contextmanager
+from zlib import crc32
+import os
+from models import db, ParkingLot, LotShard, SHARDED_TABLES, shard_bind
+from .sqlite_tuning import is_file_sqlite
+
+
+# Spot and reservation ids of shard k are allocated upwards from
+# k * SHARD_ID_SPAN + 1, so an id alone tells which shard its row is on.
+SHARD_ID_SPAN = 2 ** 40
+
+# Shard of each lot seen by this process. A lot never changes shard.
+_lot_shards = {}
+
+
+def shard_count(app=None):
+    return (app or current_app).config.get('DB_SHARDS') or 1
+
+
+def shard_uri(uri, shard):
+    """The database next to the primary one that holds shard `shard`: db.sqlite3 -> db.shard1.sqlite3."""
+    url = make_url(uri)
+    stem, ext = os.path.splitext(url.database)
+    return url.set(database=f'file:{stem}.shard{shard}{ext}', query={**url.query, 'uri': 'true'}).render_as_string()
+
+
+# --------------------------
+# Shard Setup
+# --------------------------
+def configure_shards(app):
+    """
+    Adds a bind for each shard past the first when DB_SHARDS > 1. Shard 0 is
+    the primary database, which also keeps the catalog: users, vehicles,
+    addresses and lots. Sharding needs a file-backed SQLite database and is
+    turned off otherwise. Must run before db.init_app(app).
+    """
+    shards = shard_count(app)
+    if shards < 2:
+        return
+
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not is_file_sqlite(uri):
+        app.config['DB_SHARDS'] = 1
+        return
+
+    binds = {shard_bind(shard): shard_uri(uri, shard) for shard in range(1, shards)}
+    app.config['SQLALCHEMY_BINDS'] = {**(app.config.get('SQLALCHEMY_BINDS') or {}), **binds}
+
+
+def attach_catalog(path):
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.execute('ATTACH DATABASE ? AS catalog', (f'file:{path}?mode=ro',))
+    return on_connect
+
+
+def init_sharding(app):
+    """
+    Attaches the primary database read-only to every shard connection, so
+    shard queries join users, vehicles and lots as if they were local while
+    only the primary engine ever writes them. Must run after init_sqlite(app),
+    whose journal_mode pragma would otherwise also hit the attachment.
+    """
+    shards = shard_count(app)
+    if shards < 2:
+        return
+
+    with app.app_context():
+        path = db.engines[None].url.database
+        for shard in range(1, shards):
+            event.listen(db.engines[shard_bind(shard)], 'connect', attach_catalog(path))
+
+
+def create_shards():
+    """
+    Creates the sharded tables and their indexes in every shard past the
+    first, and starts their id sequences at the shard's range. Safe to run
+    again.
+    """
+    tables = [table for table in db.metadata.sorted_tables if table.name in SHARDED_TABLES]
+    for shard in range(1, shard_count()):
+        engine = db.engines[shard_bind(shard)]
+        db.metadata.create_all(engine, tables=tables)
+        with engine.begin() as connection:
+            for table in tables:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+                if table.name != 'daily_lot_stats':
+                    connection.execute(
+                        text('INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq '
+                             'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)'),
+                        {'name': table.name, 'seq': shard * SHARD_ID_SPAN},
+                    )
+
+
+# --------------------------
+# Shard Lookup
+# --------------------------
+def shard_for_region(state):
+    """
+    The shard a new lot in `state` is created on: its entry in
+    DB_SHARD_REGIONS ('Karnataka=1,Maharashtra=2'), or else a stable hash
+    of the name. A lot keeps its shard if its address changes later.
+    """
+    shards = shard_count()
+    regions = {}
+    for entry in (current_app.config.get('DB_SHARD_REGIONS') or '').split(','):
+        region, _, shard = entry.partition('=')
+        if shard.strip():
+            regions[region.strip().lower()] = int(shard)
+
+    region = (state or '').strip().lower()
+    if region in regions:
+        return regions[region] % shards
+    return crc32(region.encode()) % shards
+
+
+def assign_shard(lot):
+    """Puts a new lot on the shard of its region and returns it. Call before the lot's spots are added."""
+    if shard_count() < 2:
+        return 0
+    shard = shard_for_region(lot.address.state)
+    lot.shard_assignment = LotShard(shard=shard)
+    return shard
+
+
+def shard_of_lot(lot_id):
+    """The shard holding a lot's spots and reservations."""
+    if shard_count() < 2:
+        return 0
+    if lot_id in _lot_shards:
+        return _lot_shards[lot_id]
+
+    row = db.session.execute(
+        select(ParkingLot.id, LotShard.shard)
+        .outerjoin(LotShard, LotShard.lot_id == ParkingLot.id)
+        .where(ParkingLot.id == lot_id)
+    ).first()
+    if row is None:
+        return 0
+    # Lots from before sharding was turned on have no row and stay on the primary.
+    _lot_shards[lot_id] = row.shard or 0
+    return _lot_shards[lot_id]
+
+
+def forget_lot_shard(lot_id):
+    _lot_shards.pop(lot_id, None)
+
+
+def shard_of_row(row_id):
+    """The shard a spot or reservation id was allocated on."""
+    shard = (row_id - 1) // SHARD_ID_SPAN if row_id else 0
+    return shard if 0 <= shard < shard_count() else 0
+
+
+def is_sharded(entity):
+    return getattr(entity, '__tablename__', None) in SHARDED_TABLES
+
+
+# --------------------------
+# Cross-shard Helpers
+# --------------------------
+@contextmanager
+def on_shard(shard):
+    """Runs the block's spot and reservation queries and writes on `shard`."""
+    previous = g.get('db_shard')
+    g.db_shard = shard
+    try:
+        yield
+    finally:
+        g.db_shard = previous
+
+
+def current_shard():
+    return g.get('db_shard') or 0
+
+
+def each_shard(fetch):
+    """Calls fetch() on every shard in turn and returns the results, shard 0 first."""
+    if shard_count() < 2:
+        return [fetch()]
+
+    results = []
+    for shard in range(shard_count()):
+        with on_shard(shard):
+            results.append(fetch())
+    return results
+
+
+def gather(fetch, key=None, reverse=False, limit=None):
+    """
+    Concatenates the lists fetch() returns on every shard, sorted by `key`
+    and cut to `limit`. For a query ordered and limited the same way, that
+    is the query's result over the whole database. With a single shard it
+    is fetch() as is.
+    """
+    results = each_shard(fetch)
+    if len(results) == 1:
+        return list(results[0])
+
+    rows = [row for result in results for row in result]
+    if key is not None:
+        rows.sort(key=key, reverse=reverse)
+    return rows[:limit] if limit is not None else rows
@@ -0,0 +1,78 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from models import db
+
+
+# Pragmas run on every new connection, per DB_PROFILE. 'production' lets
+# readers carry on while a booking writes (WAL), only fsyncs at checkpoints
+# (safe under WAL), waits for a busy writer instead of failing with
+# "database is locked", and gives each connection a memory-mapped file and
+# a bigger page cache.
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16000,  # KiB, per connection
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def sqlite_pragmas(app):
+    pragmas = dict(SQLITE_PROFILES[app.config.get('DB_PROFILE') or 'default'])
+    if 'busy_timeout' in pragmas and app.config.get('DB_BUSY_TIMEOUT') is not None:
+        pragmas['busy_timeout'] = app.config['DB_BUSY_TIMEOUT']
+    return pragmas
+
+
+def is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+# --------------------------
+# Engine Setup
+# --------------------------
+def configure_engine_options(app):
+    """
+    Sizes the connection pool of a file-backed SQLite database for the
+    production profile: one connection per worker thread (DB_POOL_SIZE)
+    plus DB_POOL_OVERFLOW for bursts. Must run before db.init_app(app);
+    options already in SQLALCHEMY_ENGINE_OPTIONS win.
+    """
+    if app.config.get('DB_PROFILE') != 'production' or not is_file_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', app.config.get('DB_POOL_SIZE', 16))
+    options.setdefault('max_overflow', app.config.get('DB_POOL_OVERFLOW', 16))
+    options.setdefault('pool_timeout', 30)
+
+
+def set_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return on_connect
+
+
+def init_sqlite(app):
+    """Runs the DB_PROFILE pragmas on every new connection of the app's SQLite engines."""
+    pragmas = sqlite_pragmas(app)
+    if not pragmas:
+        return
+
+    # A read-only connection cannot switch the journal mode; the file keeps
+    # the one the primary set.
+    read_only = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                ro = engine.url.query.get('mode') == 'ro'
+                event.listen(engine, 'connect', set_pragmas(read_only if ro else pragmas))
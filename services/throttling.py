@@ -0,0 +1,87 @@
+from flask import current_app
+from cachetools import TTLCache
+from math import ceil
+from threading import Lock
+from time import monotonic
+
+
+# --------------------------
+# Token Buckets
+# --------------------------
+class TokenBucket:
+    """
+    One token bucket per key, each holding up to `burst` tokens and
+    refilling at `burst` per `period` seconds. A key left alone for a whole
+    period is full again, so it is simply dropped; past `maxsize` keys the
+    least recently used are dropped too.
+    """
+
+    def __init__(self, burst, period, maxsize=10000):
+        self.burst = burst
+        self.rate = burst / period
+        self._buckets = TTLCache(maxsize=maxsize, ttl=period)
+        self._lock = Lock()
+
+    def _tokens(self, key, now):
+        tokens, since = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - since) * self.rate)
+
+    def wait(self, key):
+        """Seconds until `key` has a token again; 0 if it has one now."""
+        with self._lock:
+            tokens = self._tokens(key, monotonic())
+        return 0 if tokens >= 1 else ceil((1 - tokens) / self.rate)
+
+    def take(self, key):
+        """Takes a token from `key` and returns 0, or returns the seconds to wait if there is none."""
+        with self._lock:
+            now = monotonic()
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                return ceil((1 - tokens) / self.rate)
+            self._buckets[key] = (tokens - 1, now)
+            return 0
+
+
+def parse_limit(limit):
+    """'30/60' -> (30, 60.0): 30 attempts per 60 seconds. Empty or '0' turns the limit off."""
+    burst, _, period = (limit or '').partition('/')
+    if not burst.strip() or int(burst) <= 0:
+        return None
+    return int(burst), float(period or 60)
+
+
+def auth_limit(name):
+    """The app's AUTH_<NAME>_LIMIT bucket, created on first use; None when the limit is off."""
+    buckets = current_app.extensions.setdefault('auth_limits', {})
+    if name not in buckets:
+        limit = parse_limit(current_app.config.get(f'AUTH_{name.upper()}_LIMIT'))
+        buckets[name] = TokenBucket(*limit) if limit else None
+    return buckets[name]
+
+
+# --------------------------
+# Auth Throttling
+# --------------------------
+def throttle_ip(address):
+    """
+    Counts one sign-in, sign-up or password change attempt against the
+    client's AUTH_IP_LIMIT. Returns the seconds it must wait, or 0.
+    """
+    bucket = auth_limit('ip')
+    return bucket.take(address or '') if bucket else 0
+
+
+def email_wait(email):
+    """
+    Seconds before `email` may try to log in again, after using up its
+    AUTH_EMAIL_LIMIT of failed attempts from any number of addresses.
+    """
+    bucket = auth_limit('email')
+    return bucket.wait(email.lower()) if bucket else 0
+
+
+def login_failed(email):
+    bucket = auth_limit('email')
+    if bucket:
+        bucket.take(email.lower())